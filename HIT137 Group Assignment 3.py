@@ -1,24 +1,55 @@
 # Import necessary libraries
-import cv2  # OpenCV for image processing
+import math  # Math for rounding crop coordinates
+import os  # OS for file system paths
+import time  # Time for measuring background loads
+from concurrent.futures import CancelledError  # Raised when a background job is cancelled
 import tkinter as tk  # Tkinter for GUI
 from tkinter import filedialog, Scale, messagebox  # Tkinter modules for file dialogs, sliders, and message boxes
-from PIL import Image, ImageTk  # PIL for image manipulation and display
+import image_operations as ops  # Image operations shared with the batch tool
+from edit_pipeline import EditPipeline  # Non-destructive edits rendered on demand
+from history import EditHistory, DEFAULT_MEMORY_BUDGET  # Memory-bounded undo/redo history
+from preview_cache import PreviewCache  # Cached multi-resolution previews for the canvases
+from io_workers import BackgroundWorkers, SaveJob  # Background loading and saving
+from viewport import Viewport, ZOOM_STEP  # Zoomable, pannable tiled views for the canvases
+from instrumentation import Timings  # Opt-in per-callback timings
+from export_profiles import ExportJob, format_report  # Multi-rendition export
+from image_cache import DecodedImageCache  # On-disk cache of decoded images
+from video_process import VideoExportJob, read_first_frame, VIDEO_EXTENSIONS  # Streaming video processing
+
+RESIZE_DEBOUNCE_MS = 50  # Delay before redrawing after the last window resize event
+VIDEO_PROGRESS_MS = 500  # Interval between progress updates of running video exports
+TIMED_CALLBACKS = {"crop": "crop_image", "resize": "resize_image", "resize_preview": "render_resize_preview", "rotate": "rotate_image", "grayscale": "convert_to_grayscale", "redraw": "display_image", "undo": "undo", "redo": "redo"}  # Callbacks timed when profiling
 
 # Define the main application class
 class ImageProcessingApp:
-    def __init__(self, root):
+    def __init__(self, root, history_budget=DEFAULT_MEMORY_BUDGET, profile=False):
         # Initialize the application with the root window
         self.root = root
         self.root.title("Image Processing App")  # Set the title of the window
         self.configure_window()  # Configure the window size and position
         self.image = None  # Variable to store the original image
-        self.cropped_image = None  # Variable to store the cropped image
-        self.original_cropped = None  # Variable to store the original cropped image before resizing
-        self.undo_stack = []  # Stack to store states for undo functionality
-        self.redo_stack = []  # Stack to store states for redo functionality
+        self.pipeline = None  # Edits applied to the original image, starting with the crop
+        self.video_source = None  # Video whose first frame is shown, if a video was loaded
+        self.history = EditHistory(history_budget)  # History of states for undo and redo functionality
+        self.previews = PreviewCache()  # Cache of downscaled previews used when redrawing the canvases
+        self.resize_job = None  # Pending redraw scheduled by a window resize
+        self.io = BackgroundWorkers(self.root)  # Workers that load and save images off the Tk thread
+        self.image_cache = DecodedImageCache()  # Decoded images shared with the batch tools, for instant reopening
+        self.load_token = 0  # Identifies the most recent load so stale results can be ignored
+        self.loading = False  # Flag to indicate if a load is in progress
+        self.save_jobs = []  # Saves that are queued or running
+        self.video_progress_job = None  # Pending progress update of the video exports
+        self.pending_resize = None  # Latest slider value not yet committed to the edits
+        self.scrub_job = None  # Pending preview render scheduled by the slider
+        self.pan_x, self.pan_y = None, None  # Last mouse position while panning
         self.cropping = False  # Flag to indicate if cropping is in progress
         self.start_x, self.start_y, self.end_x, self.end_y = None, None, None, None  # Coordinates for cropping
 
+        self.timings = Timings() if profile else None  # Per-callback timings, only recorded when profiling
+        self.load_started = None  # Time the current load was started
+        if self.timings is not None:
+            self.instrument_callbacks()  # Wrap the callbacks before the buttons and bindings refer to them
+
         self.create_ui_elements()  # Create UI elements like buttons and canvases
         self.bind_shortcuts()  # Bind keyboard shortcuts to functions
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)  # Handle window closing event
@@ -51,6 +82,8 @@ class ImageProcessingApp:
         self.canvas.pack(pady=10, expand=True, anchor=tk.CENTER)  # Pack the canvas for the original image
         self.cropped_canvas = tk.Canvas(self.cropped_frame, width=400, height=400, bg="gray", highlightthickness=0)
         self.cropped_canvas.pack(pady=10, expand=True, anchor=tk.CENTER)  # Pack the canvas for the cropped image
+        self.canvas.viewport = Viewport(self.canvas, self.previews)  # Zoomable view of the original image
+        self.cropped_canvas.viewport = Viewport(self.cropped_canvas, self.previews)  # Zoomable view of the cropped image
 
         # Define button style
         button_style = {"bg": "blue", "fg": "white", "padx": 10, "pady": 5}
@@ -63,6 +96,9 @@ class ImageProcessingApp:
         self.top_frame.grid_columnconfigure(4, weight=1)
         self.top_frame.grid_columnconfigure(5, weight=1)
         self.top_frame.grid_columnconfigure(6, weight=1)
+        self.top_frame.grid_columnconfigure(7, weight=1)
+        self.top_frame.grid_columnconfigure(8, weight=1)
+        self.top_frame.grid_columnconfigure(9, weight=1)
 
         # Create and place buttons in the top frame
         self.load_button = tk.Button(self.top_frame, text="Load Image", command=self.load_image, **button_style)
@@ -86,14 +122,39 @@ class ImageProcessingApp:
         self.redo_button = tk.Button(self.top_frame, text="Redo", command=self.redo, **button_style)
         self.redo_button.grid(row=0, column=6, padx=5, sticky="ew")  # Redo button
 
+        self.cancel_save_button = tk.Button(self.top_frame, text="Cancel Saves", command=self.cancel_saves, **button_style)
+        self.cancel_save_button.grid(row=0, column=7, padx=5, sticky="ew")  # Cancel saves button
+
+        self.load_video_button = tk.Button(self.top_frame, text="Load Video", command=self.load_video, **button_style)
+        self.load_video_button.grid(row=0, column=8, padx=5, sticky="ew")  # Load video button
+
+        self.export_button = tk.Button(self.top_frame, text="Export", command=self.export_image, **button_style)
+        self.export_button.grid(row=0, column=9, padx=5, sticky="ew")  # Export renditions button
+
         # Create a slider for resizing the image
-        self.resize_slider = Scale(self.top_frame, from_=10, to=200, orient=tk.HORIZONTAL, label="Resize (%)", command=self.resize_image, bg="lightblue", fg="blue")
-        self.resize_slider.grid(row=1, column=0, columnspan=7, padx=5, pady=10, sticky="ew")  # Place the slider
+        self.resize_slider = Scale(self.top_frame, from_=10, to=200, orient=tk.HORIZONTAL, label="Resize (%)", command=self.preview_resize, bg="lightblue", fg="blue")
+        self.resize_slider.grid(row=1, column=0, columnspan=10, padx=5, pady=10, sticky="ew")  # Place the slider
+        self.resize_slider.bind("<ButtonRelease-1>", self.commit_resize)  # Commit the resize when the slider is released
+        self.resize_slider.bind("<KeyRelease>", self.commit_resize)  # Commit the resize after moving the slider with the keyboard
+
+        # Create a label for background loading and saving progress
+        self.status_label = tk.Label(self.top_frame, text="", bg="lightblue", fg="blue", anchor="w")
+        self.status_label.grid(row=2, column=0, columnspan=10, padx=5, sticky="ew")  # Place the status label
 
         # Bind mouse events to the canvas
         self.canvas.bind("<ButtonPress-1>", self.on_button_press)  # Bind mouse button press event
         self.canvas.bind("<B1-Motion>", self.on_mouse_drag)  # Bind mouse drag event
         self.canvas.bind("<ButtonRelease-1>", self.on_button_release)  # Bind mouse button release event
+        self.cropped_canvas.bind("<ButtonPress-1>", self.on_pan_start)  # Drag the cropped image to pan
+        self.cropped_canvas.bind("<B1-Motion>", self.on_pan_drag)
+        for canvas in (self.canvas, self.cropped_canvas):
+            canvas.bind("<ButtonPress-2>", self.on_pan_start)  # Drag with the middle button to pan
+            canvas.bind("<B2-Motion>", self.on_pan_drag)
+            canvas.bind("<ButtonPress-3>", self.on_pan_start)  # Drag with the right button to pan
+            canvas.bind("<B3-Motion>", self.on_pan_drag)
+            canvas.bind("<MouseWheel>", self.on_mouse_wheel)  # Zoom with the mouse wheel on Windows and macOS
+            canvas.bind("<Button-4>", self.on_mouse_wheel)  # Zoom in with the mouse wheel on Linux
+            canvas.bind("<Button-5>", self.on_mouse_wheel)  # Zoom out with the mouse wheel on Linux
         self.root.bind("<Configure>", self.on_window_resize)  # Bind window resize event
 
     def bind_shortcuts(self):
@@ -104,55 +165,149 @@ class ImageProcessingApp:
         self.root.bind("<Control-o>", lambda event: self.load_image())  # Ctrl+O for load
         self.root.bind("<Control-g>", lambda event: self.convert_to_grayscale())  # Ctrl+G for grayscale
         self.root.bind("<Control-r>", lambda event: self.rotate_image())  # Ctrl+R for rotate
+        if self.timings is not None:
+            self.root.bind("<Control-t>", lambda event: self.show_timings())  # Ctrl+T for the timings panel
+
+    def instrument_callbacks(self):
+        # Replace the timed callbacks with wrappers that record their duration
+        for name, method in TIMED_CALLBACKS.items():
+            setattr(self, method, self.timings.wrap(name, getattr(self, method)))
+
+    def show_timings(self):
+        # Show the recorded timings in a small panel
+        panel = tk.Toplevel(self.root, bg="lightblue")  # Create the panel window
+        panel.title("Timings")
+        text = tk.Text(panel, width=60, height=14, font=("Courier", 10))  # Monospaced text keeps the table aligned
+        text.pack(padx=10, pady=10, fill=tk.BOTH, expand=True)
+
+        def refresh():
+            # Show the latest timings
+            text.delete("1.0", tk.END)
+            text.insert(tk.END, self.timings.format())
+
+        button_style = {"bg": "blue", "fg": "white", "padx": 10, "pady": 5}
+        tk.Button(panel, text="Refresh", command=refresh, **button_style).pack(side=tk.LEFT, padx=10, pady=5)
+        tk.Button(panel, text="Save JSON", command=self.dump_timings, **button_style).pack(side=tk.LEFT, padx=10, pady=5)
+        refresh()
+
+    def dump_timings(self):
+        # Save the recorded timings to a JSON file
+        file_path = filedialog.asksaveasfilename(defaultextension=".json", filetypes=[("JSON Files", "*.json")])  # Open save file dialog
+        if file_path:
+            self.timings.dump(file_path)
 
     def load_image(self):
-        # Load an image from the file system
+        # Load an image from the file system without blocking the window
         file_path = filedialog.askopenfilename(filetypes=[("Image Files", "*.png;*.jpg;*.jpeg;*.bmp")])  # Open file dialog
         if file_path:
-            self.image = cv2.imread(file_path)  # Read the image using OpenCV
-            if self.image is not None:
-                self.display_image(self.image, self.canvas)  # Display the image on the canvas
-                self.display_image(None, self.cropped_canvas)  # Clear the cropped canvas
-                self.undo_stack.append({"original_image": self.image.copy()})  # Save the original image to the undo stack
-                self.redo_stack.clear()  # Clear the redo stack
-            else:
-                messagebox.showerror("Error", "Failed to load image.")  # Show error if image loading fails
+            self.load_token += 1  # Results of earlier loads are now stale
+            token = self.load_token
+            self.loading = True  # Set the loading flag to True
+            self.load_started = time.perf_counter()  # Time the load from the moment it was requested
+            self.status_label.config(text=f"Loading {os.path.basename(file_path)}...")  # Show progress
+            self.io.submit(self.image_cache.probe, file_path, on_done=lambda result: self.on_cache_probed(token, file_path, *result), on_error=lambda error: self.on_load_failed(token))  # Look for a cached decode first
+
+    def on_cache_probed(self, token, file_path, key, cached):
+        # Show a cached image straight away, or start decoding a quick preview and the full image
+        if token != self.load_token:
+            return  # A newer load has started
+        if cached is not None:
+            self.on_image_loaded(token, cached[0], levels=cached[1])  # Mapped in a few milliseconds; no preview needed
+            return
+        if file_path.lower().endswith(ops.JPEG_EXTENSIONS):
+            self.io.submit(ops.read_preview, file_path, on_done=lambda image: self.on_preview_loaded(token, image))  # Decode a quick preview first
+        self.io.submit(self.image_cache.load, file_path, key, on_done=lambda result: self.on_image_loaded(token, result[0], levels=result[1]), on_error=lambda error: self.on_load_failed(token))  # Decode the full image and cache it
+
+    def load_video(self):
+        # Load the first frame of a video; the edits chosen on it are applied to every frame when saving
+        file_path = filedialog.askopenfilename(filetypes=[("Video Files", ";".join("*" + extension for extension in VIDEO_EXTENSIONS))])  # Open file dialog
+        if file_path:
+            self.load_token += 1  # Results of earlier loads are now stale
+            token = self.load_token
+            self.loading = True  # Set the loading flag to True
+            self.load_started = time.perf_counter()  # Time the load from the moment it was requested
+            self.status_label.config(text=f"Loading {os.path.basename(file_path)}...")  # Show progress
+            self.io.submit(read_first_frame, file_path, on_done=lambda frame: self.on_image_loaded(token, frame, file_path), on_error=lambda error: self.on_load_failed(token))  # Decode the first frame
+
+    def on_preview_loaded(self, token, image):
+        # Show the reduced-resolution preview while the full image is still decoding
+        if token == self.load_token and self.loading:
+            self.display_image(image, self.canvas)  # Display the preview on the canvas
+            self.display_image(None, self.cropped_canvas)  # Clear the cropped canvas
+
+    def on_image_loaded(self, token, image, video_source=None, levels=()):
+        # Replace the preview with the fully decoded image or first video frame
+        if token != self.load_token:
+            return  # A newer load has started
+        if levels:
+            self.previews.pyramid(image, levels)  # Reuse the cached preview levels instead of rebuilding them
+        self.loading = False  # Reset the loading flag
+        if self.timings is not None:
+            self.timings.record("load", time.perf_counter() - self.load_started)  # Record the decode including time spent queued
+        self.status_label.config(text="")  # Clear the progress message
+        self.image = image  # Store the loaded image
+        self.video_source = video_source  # Remember the video the frame came from
+        self.display_image(self.image, self.canvas)  # Display the image on the canvas
+        self.pipeline = None  # Clear the edits
+        self.show_edits()  # Clear the cropped canvas
+        self.sync_resize_slider()  # A new image starts at 100%
+        self.record_state("load", ("original_image", "pipeline", "video_source"))  # Save the loaded image to the history
+
+    def on_load_failed(self, token):
+        # Report a failed load
+        if token != self.load_token:
+            return  # A newer load has started
+        self.loading = False  # Reset the loading flag
+        self.status_label.config(text="")  # Clear the progress message
+        if self.image is not None:
+            self.display_image(self.image, self.canvas)  # Put back the image that was shown before the preview
+        messagebox.showerror("Error", "Failed to load image.")  # Show error if image loading fails
 
-    def display_image(self, image, canvas):
-        # Display an image on a given canvas
+    def display_image(self, image, canvas, keep_view=False):
+        # Display an image or EditPipeline on a given canvas, rendering only the visible tiles
         if image is not None:
-            image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)  # Convert image from BGR to RGB
-            pil_image = Image.fromarray(image)  # Convert the image to a PIL image
-
             canvas_width = canvas.winfo_width()  # Get the width of the canvas
             canvas_height = canvas.winfo_height()  # Get the height of the canvas
             if canvas_width == 0 or canvas_height == 0:
                 return  # Return if canvas dimensions are zero
 
-            img_width, img_height = pil_image.size  # Get the dimensions of the image
-            ratio = min(canvas_width / img_width, canvas_height / img_height)  # Calculate the scaling ratio
-            new_width = int(img_width * ratio)  # Calculate the new width
-            new_height = int(img_height * ratio)  # Calculate the new height
-            resized_image = pil_image.resize((new_width, new_height), Image.LANCZOS)  # Resize the image
-            image_tk = ImageTk.PhotoImage(resized_image)  # Convert the resized image to a Tkinter-compatible format
-            canvas.image = image_tk  # Store the image reference to prevent garbage collection
-
-            x_offset = (canvas_width - new_width) // 2  # Calculate the x offset to center the image
-            y_offset = (canvas_height - new_height) // 2  # Calculate the y offset to center the image
-
-            canvas.delete("image")  # Clear any existing image on the canvas
-            canvas.create_image(x_offset, y_offset, anchor=tk.NW, image=image_tk, tags=("image",))  # Display the image
+            canvas.viewport.set_image(image, keep_view)  # Show the image, fitted to the canvas unless the view is kept
+            canvas.viewport.render()  # Draw the visible tiles
 
             canvas.config(width=canvas_width, height=canvas_height)  # Update the canvas dimensions
 
         else:
+            canvas.viewport.clear()  # Forget the image and its tiles
             canvas.delete("all")  # Clear the canvas if no image is provided
-            canvas.image = None  # Remove the image reference
             canvas.config(width=400, height=400)  # Reset the canvas size
 
+    def on_pan_start(self, event):
+        # Remember where panning started
+        self.pan_x, self.pan_y = event.x, event.y
+
+    def on_pan_drag(self, event):
+        # Pan the view under the mouse
+        if self.pan_x is not None:
+            event.widget.delete("rect")  # The crop rectangle no longer matches the view
+            event.widget.viewport.pan(event.x - self.pan_x, event.y - self.pan_y)  # Move the view with the mouse
+            event.widget.viewport.render()  # Redraw, reusing the cached tiles
+            self.pan_x, self.pan_y = event.x, event.y
+
+    def on_mouse_wheel(self, event):
+        # Zoom the view around the mouse position
+        if event.num == 4 or getattr(event, "delta", 0) > 0:
+            factor = ZOOM_STEP  # Zoom in
+        else:
+            factor = 1 / ZOOM_STEP  # Zoom out
+        event.widget.delete("rect")  # The crop rectangle no longer matches the view
+        event.widget.viewport.zoom_at(event.x, event.y, factor)
+        event.widget.viewport.render()  # Render only the tiles now visible, at screen resolution
+
     def start_crop(self):
         # Start the cropping process
-        if self.image is not None:
+        if self.loading:
+            messagebox.showinfo("Info", "Please wait until the image has finished loading.")  # Crop coordinates need the full image
+        elif self.image is not None:
             self.cropping = True  # Set the cropping flag to True
             messagebox.showinfo("Crop Mode", "Draw a rectangle to crop the image on the ORIGINAL image.")  # Show instructions
         else:
@@ -162,12 +317,16 @@ class ImageProcessingApp:
         # Handle mouse button press event
         if self.cropping and event.widget == self.canvas:
             self.start_x, self.start_y = event.x, event.y  # Store the starting coordinates of the crop rectangle
+        else:
+            self.on_pan_start(event)  # Drag to pan when not cropping
 
     def on_mouse_drag(self, event):
         # Handle mouse drag event
         if self.cropping and event.widget == self.canvas:
             self.canvas.delete("rect")  # Clear any existing rectangle
             self.canvas.create_rectangle(self.start_x, self.start_y, event.x, event.y, outline="red", tag="rect")  # Draw the crop rectangle
+        else:
+            self.on_pan_drag(event)  # Pan when not cropping
 
     def on_button_release(self, event):
         # Handle mouse button release event
@@ -179,141 +338,241 @@ class ImageProcessingApp:
     def crop_image(self):
         # Crop the image based on the selected rectangle
         if self.image is not None:
-            canvas_width = self.canvas.winfo_width()  # Get the canvas width
-            canvas_height = self.canvas.winfo_height()  # Get the canvas height
-            img_width, img_height = self.image.shape[1], self.image.shape[0]  # Get the image dimensions
-
-            ratio_x = img_width / canvas_width  # Calculate the x ratio
-            ratio_y = img_height / canvas_height  # Calculate the y ratio
-
-            x1 = int(self.start_x * ratio_x)  # Calculate the x1 coordinate in the image
-            y1 = int(self.start_y * ratio_y)  # Calculate the y1 coordinate in the image
-            x2 = int(self.end_x * ratio_x)  # Calculate the x2 coordinate in the image
-            y2 = int(self.end_y * ratio_y)  # Calculate the y2 coordinate in the image
-
-            x1 = max(0, min(x1, img_width - 1))  # Ensure x1 is within the image bounds
-            y1 = max(0, min(y1, img_height - 1))  # Ensure y1 is within the image bounds
-            x2 = max(0, min(x2, img_width - 1))  # Ensure x2 is within the image bounds
-            y2 = max(0, min(y2, img_height - 1))  # Ensure y2 is within the image bounds
-
-            if x1 >= x2 or y1 >= y2:
+            viewport = self.canvas.viewport  # The view maps canvas positions to exact image pixels
+            x1, y1 = viewport.canvas_to_image(self.start_x, self.start_y)  # Calculate the top-left corner in the image
+            x2, y2 = viewport.canvas_to_image(self.end_x, self.end_y)  # Calculate the bottom-right corner in the image
+            x1, y1, x2, y2 = (int(math.floor(value + 0.5)) for value in (x1, y1, x2, y2))  # Snap to the nearest pixel boundaries
+
+            try:
+                self.pipeline = EditPipeline(self.image).cropped(x1, y1, x2, y2)  # Start new edits from the cropped area
+            except ValueError:
                 messagebox.showwarning("Warning", "Invalid cropping area. Please try again.")  # Show warning if the cropping area is invalid
                 return
-
-            self.cropped_image = self.image[y1:y2, x1:x2]  # Crop the image
-            self.original_cropped = self.cropped_image.copy()  # Store the original cropped image
-            self.display_image(self.cropped_image, self.cropped_canvas)  # Display the cropped image
-            self.undo_stack.append({"original_image": self.image.copy(), "cropped_image": self.cropped_image.copy(), "original_cropped": self.original_cropped.copy()})  # Save the state to the undo stack
-            self.redo_stack.clear()  # Clear the redo stack
+            self.apply_edit("crop")  # Display and record the crop
+
+    def preview_resize(self, value):
+        # Preview the resize while the slider moves, without touching the edits or the history
+        if self.pipeline is not None:
+            self.pending_resize = int(value)  # Keep only the latest value; stale ones are never rendered
+            if self.scrub_job is None:
+                self.scrub_job = self.root.after_idle(self.render_resize_preview)  # Render once the pending events are handled
+
+    def render_resize_preview(self):
+        # Render the latest slider value at preview resolution
+        self.scrub_job = None  # The scheduled render is running
+        if self.pipeline is not None and self.pending_resize is not None:
+            if self.pending_resize == self.pipeline.resize_percent():
+                preview = self.pipeline  # Back at the committed value, e.g. after the slider was synced; show the edits themselves
+            else:
+                preview = self.pipeline.resized(self.pending_resize)  # Try the value on a copy of the edits
+            self.display_image(preview, self.cropped_canvas, keep_view=True)  # Render the visible tiles of the preview without moving the view
+
+    def commit_resize(self, event):
+        # Apply the slider value to the edits as a single history entry
+        if self.scrub_job is not None:
+            self.root.after_cancel(self.scrub_job)  # The committed edits are rendered instead
+            self.scrub_job = None
+        self.pending_resize = None  # The slider itself is read; its last command may not have run yet
+        if self.pipeline is not None:
+            value = int(self.resize_slider.get())
+            if value != self.pipeline.resize_percent():
+                self.resize_image(value)  # Commit the new value
+            else:
+                self.show_edits()  # Nothing changed; replace any preview with the committed edits
 
     def resize_image(self, value):
         # Resize the cropped image based on the slider value
-        if self.original_cropped is not None:
-            scale = int(value) / 100  # Convert the slider value to a scale factor
-            original_height, original_width = self.original_cropped.shape[:2]  # Get the original dimensions
-
-            new_width = int(original_width * scale)  # Calculate the new width
-            new_height = int(original_height * scale)  # Calculate the new height
-
-            resized_image = cv2.resize(self.original_cropped, (new_width, new_height), interpolation=cv2.INTER_AREA)  # Resize the image
-            self.cropped_image = resized_image  # Update the cropped image
-            self.display_image(resized_image, self.cropped_canvas)  # Display the resized image
-            self.undo_stack.append({"original_image": self.image.copy(), "cropped_image": self.cropped_image.copy(), "original_cropped": self.original_cropped.copy()})  # Save the state to the undo stack
-            self.redo_stack.clear()  # Clear the redo stack
+        if self.pipeline is not None:
+            self.pipeline = self.pipeline.resized(value)  # Replace any earlier resize
+            self.apply_edit("resize")  # Display and record the resize
 
     def convert_to_grayscale(self):
         # Convert the cropped image to grayscale
-        if self.cropped_image is not None:
-            self.cropped_image = cv2.cvtColor(self.cropped_image, cv2.COLOR_BGR2GRAY)  # Convert to grayscale
-            self.cropped_image = cv2.cvtColor(self.cropped_image, cv2.COLOR_GRAY2BGR)  # Convert back to BGR for display
-            self.display_image(self.cropped_image, self.cropped_canvas)  # Display the grayscale image
-            self.undo_stack.append({"original_image": self.image.copy(), "cropped_image": self.cropped_image.copy(), "original_cropped": self.original_cropped.copy()})  # Save the state to the undo stack
-            self.redo_stack.clear()  # Clear the redo stack
+        if self.pipeline is not None:
+            self.pipeline = self.pipeline.grayscaled()  # Add the grayscale conversion
+            self.apply_edit("grayscale")  # Display and record the conversion
 
     def rotate_image(self):
         # Rotate the cropped image by 90 degrees
-        if self.cropped_image is not None:
-            self.cropped_image = cv2.rotate(self.cropped_image, cv2.ROTATE_90_CLOCKWISE)  # Rotate the image
-            self.display_image(self.cropped_image, self.cropped_canvas)  # Display the rotated image
-            self.undo_stack.append({"original_image": self.image.copy(), "cropped_image": self.cropped_image.copy(), "original_cropped": self.original_cropped.copy()})  # Save the state to the undo stack
-            self.redo_stack.clear()  # Clear the redo stack
+        if self.pipeline is not None:
+            self.pipeline = self.pipeline.rotated()  # Add the rotation
+            self.apply_edit("rotate")  # Display and record the rotation
+
+    def apply_edit(self, operation):
+        # Display the current edits and save them to the history
+        self.show_edits()  # Render the edits at preview resolution
+        self.sync_resize_slider()  # A crop starts again at 100%
+        self.record_state(operation, ("pipeline",))  # Save the state to the history
+
+    def sync_resize_slider(self):
+        # Move the slider to the resize of the current edits, so releasing it unmoved commits nothing
+        self.pending_resize = None  # Any scrub in progress belongs to the old edits
+        self.resize_slider.set(self.pipeline.resize_percent() if self.pipeline is not None else 100)  # Its command only redraws the same edits
+
+    def show_edits(self):
+        # Display the edits on the cropped canvas; each visible tile is rendered straight from the source image
+        keep_view = self.pipeline is not None and self.cropped_canvas.viewport.source is self.pipeline  # Same edits, so keep the zoom and position
+        self.display_image(self.pipeline, self.cropped_canvas, keep_view)  # Display the edits or clear the canvas
 
     def save_image(self):
-        # Save the cropped image to a file
-        if self.cropped_image is not None:
+        # Queue a save of the cropped image; editing can continue while it runs
+        if self.pipeline is not None and self.video_source is not None:
+            self.save_video()  # Apply the edits to every frame of the video
+        elif self.pipeline is not None:
             file_path = filedialog.asksaveasfilename(defaultextension=".png", filetypes=[("PNG Files", "*.png"), ("JPEG Files", "*.jpg")])  # Open save file dialog
             if file_path:
-                cv2.imwrite(file_path, cv2.cvtColor(self.cropped_image, cv2.COLOR_BGR2RGB))  # Save the image
-                messagebox.showinfo("Success", "Image saved successfully.")  # Show success message
+                pipeline = self.pipeline  # Save the edits as they are now, even if editing continues
+                job = SaveJob(file_path, pipeline.render)  # Render the edits at full resolution, once, and write them in their native format
+                job.future = self.io.submit(job.run, on_done=lambda path: self.on_save_finished(job, None), on_error=lambda error: self.on_save_finished(job, error), kind="save")
+                self.save_jobs.append(job)  # Track the queued save
+                self.update_save_status()
         else:
             messagebox.showwarning("Warning", "No image to save.")  # Show warning if no image is available
 
+    def save_video(self):
+        # Queue an export of the loaded video with the current edits applied to every frame
+        file_path = filedialog.asksaveasfilename(defaultextension=".mp4", filetypes=[("MP4 Files", "*.mp4"), ("AVI Files", "*.avi")])  # Open save file dialog
+        if file_path:
+            job = VideoExportJob(self.video_source, file_path, self.pipeline.operations)  # The edits are replayed on each frame
+            job.future = self.io.submit(job.run, on_done=lambda path: self.on_video_saved(job, None), on_error=lambda error: self.on_video_saved(job, error), kind="save")
+            self.save_jobs.append(job)  # Track the queued export like any other save
+            self.update_save_status()
+            if self.video_progress_job is None:
+                self.video_progress_job = self.root.after(VIDEO_PROGRESS_MS, self.show_video_progress)  # Report frames and fps while it runs
+
+    def show_video_progress(self):
+        # Show the frames and fps of running video exports until they finish
+        self.video_progress_job = None
+        jobs = [job for job in self.save_jobs if isinstance(job, VideoExportJob)]
+        if jobs:
+            reports = [f"{os.path.basename(job.file_path)}: {job.progress}" for job in jobs if job.progress]
+            if reports:
+                self.status_label.config(text="Exporting " + "; ".join(reports))
+            self.video_progress_job = self.root.after(VIDEO_PROGRESS_MS, self.show_video_progress)
+
+    def on_video_saved(self, job, error):
+        # Report a finished video export with its frame rate
+        if error is not None:
+            self.on_save_finished(job, error)  # Cancellations and failures are reported like saves
+            return
+        self.save_jobs.remove(job)  # Stop tracking the export
+        self.update_save_status()
+        if self.timings is not None:
+            self.timings.record("video_export", job.seconds)  # Record the whole export
+        rate = job.frames / job.seconds if job.seconds else 0.0
+        self.status_label.config(text=f"Saved {os.path.basename(job.file_path)}: {job.frames} frames in {job.seconds:.1f} s ({rate:.1f} fps).")  # Show success message
+
+    def export_image(self):
+        # Queue an export of the cropped image as full-size, web and thumbnail renditions
+        if self.pipeline is None:
+            messagebox.showwarning("Warning", "No image to export.")  # Show warning if no image is available
+            return
+        file_path = filedialog.asksaveasfilename(title="Export renditions as", defaultextension=".png", filetypes=[("PNG Files", "*.png")])  # Choose the folder and base name
+        if file_path:
+            base_name = os.path.splitext(os.path.basename(file_path))[0]
+            job = ExportJob(os.path.dirname(file_path), base_name, self.pipeline.render)  # Render once at full resolution and derive every rendition from it
+            job.future = self.io.submit(job.run, on_done=lambda results: self.on_export_finished(job, None), on_error=lambda error: self.on_export_finished(job, error), kind="save")
+            self.save_jobs.append(job)  # Track the export like any other save, so it can be cancelled
+            self.update_save_status()
+
+    def on_export_finished(self, job, error):
+        # Report a finished export with the encode time and size of each rendition
+        if error is not None:
+            self.on_save_finished(job, error)  # Cancellations and failures are reported like saves
+            return
+        self.save_jobs.remove(job)  # Stop tracking the export
+        self.update_save_status()
+        if self.timings is not None:
+            self.timings.record("export", job.seconds)  # Record the render, encodes and writes
+        self.status_label.config(text=f"Exported {len(job.results)} renditions of {job.base_name} in {job.seconds:.2f} s.")  # Show success message
+        messagebox.showinfo("Export", format_report(job.results))  # Show the statistics of each rendition
+
+    def on_save_finished(self, job, error):
+        # Report a finished, cancelled or failed save
+        self.save_jobs.remove(job)  # Stop tracking the save
+        self.update_save_status()
+        name = os.path.basename(job.file_path)
+        if error is None and self.timings is not None:
+            self.timings.record("save", job.seconds)  # Record the render, encode and write
+        if error is None:
+            self.status_label.config(text=f"Saved {name}.")  # Show success message
+        elif isinstance(error, CancelledError):
+            self.status_label.config(text=f"Cancelled saving {name}.")  # Show cancellation message
+        else:
+            messagebox.showerror("Error", f"Failed to save {name}.")  # Show error if image saving fails
+
+    def cancel_saves(self):
+        # Cancel every queued or running save
+        for job in self.save_jobs:
+            job.cancel()
+
+    def update_save_status(self):
+        # Show how many saves are still in progress
+        if self.save_jobs:
+            self.status_label.config(text=f"Saving {len(self.save_jobs)} image(s)...")
+
+    def record_state(self, operation, changed):
+        # Save the values changed by an operation to the history; unchanged buffers are shared
+        state = {"original_image": self.image, "pipeline": self.pipeline, "video_source": self.video_source}
+        self.history.push(operation, {key: state[key] for key in changed})  # Record the operation and its changes
+        self.prune_previews()  # The push may have evicted old images or discarded redo steps
+
+    def prune_previews(self):
+        # Keep only the preview pyramids of images that the history or a canvas still refers to
+        sources = [self.canvas.viewport.source, self.cropped_canvas.viewport.source]  # What the canvases show, including a loading preview
+        for state in self.history.states():
+            sources += [state["original_image"], state["pipeline"]]
+        self.previews.retain([source.source if isinstance(source, EditPipeline) else source for source in sources if source is not None])  # Edits are rendered from their source image
+
+    def restore_state(self, state):
+        # Restore and display a state taken from the history
+        self.image = state["original_image"]  # Restore the original image
+        self.display_image(self.image, self.canvas)  # Display the original image
+        self.pipeline = state["pipeline"]  # Restore the edits
+        self.video_source = state["video_source"]  # Restore the video the image came from
+        self.show_edits()  # Display the edited image or clear the canvas
+        self.sync_resize_slider()  # Show the resize of the restored edits
+
     def undo(self):
         # Undo the last operation
-        if len(self.undo_stack) > 1:
-            current_state = self.undo_stack.pop()  # Pop the current state from the undo stack
-            self.redo_stack.append(current_state)  # Push the current state to the redo stack
-            previous_state = self.undo_stack[-1]  # Get the previous state
-
-            self.image = previous_state["original_image"].copy()  # Restore the original image
-            self.display_image(self.image, self.canvas)  # Display the original image
-
-            cropped_image = previous_state.get("cropped_image")  # Get the cropped image from the previous state
-            if cropped_image is not None:
-                self.cropped_image = cropped_image.copy()  # Restore the cropped image
-                self.original_cropped = previous_state.get("original_cropped").copy()  # Restore the original cropped image
-                self.display_image(self.cropped_image, self.cropped_canvas)  # Display the cropped image
-            else:
-                self.cropped_image = None  # Clear the cropped image
-                self.original_cropped = None  # Clear the original cropped image
-                self.display_image(None, self.cropped_canvas)  # Clear the cropped canvas
-
+        if self.history.can_undo():
+            self.restore_state(self.history.undo())  # Restore the previous state
+        elif len(self.history):
+            self.restore_state(self.history.current_state())  # Restore the initial state
         else:
-            if self.undo_stack:
-                initial_state = self.undo_stack[0]  # Get the initial state
-                self.image = initial_state["original_image"].copy()  # Restore the initial image
-                self.display_image(self.image, self.canvas)  # Display the initial image
-                self.cropped_image = None  # Clear the cropped image
-                self.original_cropped = None  # Clear the original cropped image
-                self.display_image(None, self.cropped_canvas)  # Clear the cropped canvas
-            else:
-                messagebox.showinfo("Info", "Nothing to undo.")  # Show info if nothing to undo
+            messagebox.showinfo("Info", "Nothing to undo.")  # Show info if nothing to undo
 
     def redo(self):
         # Redo the last undone operation
-        if self.redo_stack:
-            image_state = self.redo_stack.pop()  # Pop the state from the redo stack
-            self.undo_stack.append(image_state)  # Push the state to the undo stack
-
-            self.image = image_state["original_image"].copy()  # Restore the original image
-            self.display_image(self.image, self.canvas)  # Display the original image
-
-            cropped_image = image_state.get("cropped_image")  # Get the cropped image from the state
-            if cropped_image is not None:
-                self.cropped_image = cropped_image.copy()  # Restore the cropped image
-                self.original_cropped = image_state.get("original_cropped").copy()  # Restore the original cropped image
-                self.display_image(self.cropped_image, self.cropped_canvas)  # Display the cropped image
-            else:
-                self.cropped_image = None  # Clear the cropped image
-                self.original_cropped = None  # Clear the original cropped image
-                self.display_image(None, self.cropped_canvas)  # Clear the cropped canvas
+        if self.history.can_redo():
+            self.restore_state(self.history.redo())  # Restore the next state
         else:
             messagebox.showinfo("Info", "Nothing to redo.")  # Show info if nothing to redo
 
     def on_window_resize(self, event):
-        # Handle window resize event
-        if self.image is not None:
-            self.display_image(self.image, self.canvas)  # Redisplay the original image
-        if self.cropped_image is not None:
-            self.display_image(self.cropped_image, self.cropped_canvas)  # Redisplay the cropped image
+        # Handle window resize event by coalescing bursts of events into one redraw
+        if self.resize_job is not None:
+            self.root.after_cancel(self.resize_job)  # Drop the redraw scheduled by an earlier event
+        self.resize_job = self.root.after(RESIZE_DEBOUNCE_MS, self.redraw_canvases)  # Redraw once the events settle
+
+    def redraw_canvases(self):
+        # Redraw both canvases at their current size
+        self.resize_job = None  # The scheduled redraw is running
+        if self.canvas.viewport.source is not None:
+            self.display_image(self.canvas.viewport.source, self.canvas, keep_view=True)  # Redisplay the original image or its loading preview
+        if self.pipeline is not None:
+            self.show_edits()  # Re-render the edits for the new canvas size
 
     def on_closing(self):
         # Handle window closing event
-        if messagebox.askokcancel("Quit", "Do you want to quit?"):  # Show confirmation dialog
+        message = "Saves are still in progress. Quit anyway?" if self.save_jobs else "Do you want to quit?"
+        if messagebox.askokcancel("Quit", message):  # Show confirmation dialog
+            self.cancel_saves()  # Stop unfinished saves before their files are replaced
+            self.io.shutdown()  # Stop the background workers
             self.root.destroy()  # Close the window
 
 # Entry point of the application
 if __name__ == "__main__":
     root = tk.Tk()  # Create the main Tkinter window
-    app = ImageProcessingApp(root)  # Initialize the application
+    app = ImageProcessingApp(root, profile=bool(os.environ.get("IMAGE_APP_PROFILE")))  # Initialize the application; set IMAGE_APP_PROFILE=1 to record timings
     root.mainloop()  # Start the Tkinter event loop
\ No newline at end of file
@@ -0,0 +1,155 @@
+# Import necessary libraries
+import argparse  # Argparse for the command line interface
+import glob  # Glob for expanding file patterns
+import os  # OS for file system paths
+import sys  # Sys for the exit status
+import time  # Time for measuring throughput
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait  # Process pool for parallel work
+from concurrent.futures.process import BrokenProcessPool  # Raised when a worker process dies, e.g. out of memory
+import image_operations as ops  # Image operations shared with the GUI
+from edit_pipeline import EditPipeline  # Fused rendering of a recipe
+from image_cache import DecodedImageCache, DEFAULT_CACHE_DIR  # On-disk cache of decoded images shared with the GUI
+
+
+def collect_inputs(patterns):
+    # Expand directories, glob patterns and file names into a sorted list of image files
+    files = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            candidates = [os.path.join(pattern, name) for name in os.listdir(pattern)]  # List the directory
+        else:
+            candidates = glob.glob(pattern)  # Expand the pattern
+        files.extend(path for path in candidates if path.lower().endswith(ops.IMAGE_EXTENSIONS))  # Keep only images
+    return sorted(set(files))
+
+
+def output_path_for(input_path, output_dir, extension):
+    # Build the output file name for an input file
+    name, original_extension = os.path.splitext(os.path.basename(input_path))
+    return os.path.join(output_dir, name + (extension or original_extension))
+
+
+def same_file(first, second):
+    # Check whether two paths name the same file, even if it does not exist yet
+    try:
+        return os.path.samefile(first, second)  # Follows links and case-insensitive file systems
+    except OSError:
+        return os.path.normcase(os.path.abspath(first)) == os.path.normcase(os.path.abspath(second))
+
+
+def plan_outputs(files, output_dir, extension=None, overwrite=False):
+    # Map every input file to its output file, refusing outputs that would overwrite an input or each other
+    outputs = {}
+    claimed = {}  # Normalised output path -> input that writes it
+    for input_path in files:
+        output_path = output_path_for(input_path, output_dir, extension)
+        if not overwrite and same_file(input_path, output_path):
+            raise ValueError(f"{output_path} would overwrite its input; choose another output directory or pass --overwrite")  # Raise an error before touching any file
+        key = os.path.normcase(os.path.abspath(output_path))
+        if key in claimed:
+            raise ValueError(f"{claimed[key]} and {input_path} would both be written to {output_path}")  # Raise an error for clashing names
+        claimed[key] = input_path
+        outputs[input_path] = output_path
+    return outputs
+
+
+def process_file(input_path, output_path, recipe, cache_dir=None):
+    # Decode, process and encode one file; runs inside a worker process
+    start = time.perf_counter()
+    try:
+        if cache_dir is not None:
+            image = DecodedImageCache(cache_dir).load(input_path)[0]  # Map the decoded image from the cache, or decode and store it
+        else:
+            image = ops.read_image(input_path)  # Decode the image
+        image = EditPipeline(image, recipe).render()  # Apply the recipe in one fused pass
+        ops.write_image(output_path, image)  # Encode the result
+    except Exception as error:
+        return input_path, time.perf_counter() - start, str(error)  # Report the failure instead of stopping the batch
+    return input_path, time.perf_counter() - start, None
+
+
+def run_batch(files, output_dir, recipe, workers=None, max_in_flight=None, extension=None, cache_dir=None, overwrite=False, report=print):
+    # Process files on a process pool, keeping at most max_in_flight files queued at once
+    outputs = plan_outputs(files, output_dir, extension, overwrite)  # Check every output name before writing anything
+    os.makedirs(output_dir, exist_ok=True)  # Create the output directory
+    workers = workers or os.cpu_count() or 1  # Default to one worker per core
+    max_in_flight = max_in_flight or workers * 2  # Keep every worker busy without queueing the whole batch
+    failures = []
+    start = time.perf_counter()
+    pending = {}  # Future -> (input file, whether it is a retry)
+    suspects = []  # Files in flight when a worker died; each is retried alone to find the one that killed it
+    remaining = iter(files)
+    executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        while True:
+            if suspects:
+                if not pending:
+                    input_path = suspects.pop(0)
+                    pending[executor.submit(process_file, input_path, outputs[input_path], recipe, cache_dir)] = (input_path, True)
+            else:
+                for input_path in remaining:
+                    pending[executor.submit(process_file, input_path, outputs[input_path], recipe, cache_dir)] = (input_path, False)
+                    if len(pending) >= max_in_flight:
+                        break  # Stop submitting until a file finishes
+            if not pending:
+                break  # Every file has been processed
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)  # Wait for at least one file
+            broken = False
+            for future in done:
+                input_path, retried = pending.pop(future)
+                try:
+                    _, seconds, error = future.result()
+                except BrokenProcessPool:
+                    broken = True  # Every file still in the pool fails with it
+                    if not retried:
+                        suspects.append(input_path)
+                        continue
+                    seconds, error = 0.0, "worker process died (out of memory?)"  # This file killed a worker on its own
+                if error is None:
+                    report(f"OK    {input_path} ({seconds * 1000:.1f} ms)")  # Report the processed file
+                else:
+                    failures.append((input_path, error))
+                    report(f"FAIL  {input_path}: {error}")  # Report the failed file
+            if broken:
+                executor.shutdown(wait=False)
+                executor = ProcessPoolExecutor(max_workers=workers)  # A broken pool accepts no more work
+    finally:
+        executor.shutdown()
+    elapsed = time.perf_counter() - start
+    rate = len(files) / elapsed if elapsed > 0 else 0.0
+    report(f"Processed {len(files)} files in {elapsed:.2f} s ({rate:.1f} files/s), {len(failures)} failed")  # Report the throughput
+    return failures
+
+
+def main(argv=None):
+    # Parse the command line and run the batch
+    parser = argparse.ArgumentParser(description="Apply an image processing recipe to many files without the GUI.")
+    parser.add_argument("inputs", nargs="+", help="input files, directories or glob patterns")
+    parser.add_argument("-o", "--output", required=True, help="output directory")
+    parser.add_argument("-r", "--recipe", required=True, help='steps to apply, e.g. "crop:10,10,200,200 grayscale rotate resize:50"')
+    parser.add_argument("-w", "--workers", type=int, help="number of worker processes (default: one per core)")
+    parser.add_argument("--max-in-flight", type=int, help="maximum number of files queued at once (default: twice the workers)")
+    parser.add_argument("--format", dest="extension", choices=ops.IMAGE_EXTENSIONS, help="output file type (default: keep the input type)")
+    parser.add_argument("--overwrite", action="store_true", help="allow outputs to replace their input files")
+    parser.add_argument("--cache", action="store_true", help="reuse decoded images from the GUI's cache")
+    parser.add_argument("--cache-dir", metavar="PATH", help="reuse decoded images from this cache folder instead")
+    args = parser.parse_args(argv)
+
+    try:
+        recipe = ops.parse_recipe(args.recipe)  # Parse the recipe before starting any work
+    except ValueError as error:
+        parser.error(str(error))
+    cache_dir = args.cache_dir or (DEFAULT_CACHE_DIR if args.cache else None)  # A folder of its own implies using the cache
+    files = collect_inputs(args.inputs)
+    if not files:
+        parser.error("no input images found")
+    try:
+        failures = run_batch(files, args.output, recipe, args.workers, args.max_in_flight, args.extension, cache_dir, args.overwrite)
+    except ValueError as error:
+        parser.error(str(error))  # Clashing output names; nothing has been written
+    return 1 if failures else 0
+
+
+# Entry point of the batch tool
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,185 @@
+# Import necessary libraries
+import argparse  # Argparse for the command line interface
+import glob  # Glob for finding the sample images
+import json  # JSON for saving the results
+import math  # Math for image sizes
+import os  # OS for file system paths
+import time  # Time for measuring operations
+import tracemalloc  # Tracemalloc for the memory an operation allocates and keeps
+import numpy as np  # NumPy for synthetic images
+import image_operations as ops  # Image operations shared with the GUI
+from edit_pipeline import EditPipeline  # Non-destructive edits rendered on demand
+from history import EditHistory  # Memory-bounded undo/redo history
+from instrumentation import summarize  # Latency statistics shared with the GUI timings
+from preview_cache import PreviewCache, to_display  # Preview pyramids and display conversion
+from viewport import Viewport  # Tiled rendering used by the canvases
+
+try:
+    import psutil  # Psutil for the resident set size on any platform
+except ImportError:
+    psutil = None  # Fall back to /proc on Linux; elsewhere the RSS is not reported
+
+DEFAULT_SIZES = (1, 4, 12, 24, 50, 100)  # Synthetic image sizes in megapixels
+CANVAS_SIZE = (800, 600)  # Canvas size used for preview and redraw timings
+SAMPLE_IMAGES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "images", "*")  # Sample files shipped with the repository
+
+
+def synthetic_image(megapixels, seed=0):
+    # Build a reproducible 4:3 photo-like image: smooth gradients plus noise
+    width = int(math.sqrt(megapixels * 1_000_000 * 4 / 3))
+    height = int(width * 3 / 4)
+    rng = np.random.default_rng(seed)  # Fixed seed keeps runs comparable
+    image = np.empty((height, width, 3), np.uint8)
+    image[:, :, 0] = np.linspace(0, 255, width, dtype=np.uint8)[None, :]  # Horizontal gradient
+    image[:, :, 1] = np.linspace(0, 255, height, dtype=np.uint8)[:, None]  # Vertical gradient
+    image[:, :, 2] = 128
+    image += rng.integers(0, 16, size=(height, width, 1), dtype=np.uint8)  # Noise so encoders cannot cheat
+    return image
+
+
+def rss_mb():
+    # Return the current resident set size of this process in megabytes, or NaN where it cannot be read
+    if psutil is not None:
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    try:
+        with open("/proc/self/statm") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)  # Resident pages
+    except (OSError, ValueError, AttributeError):
+        return float("nan")
+
+
+def traced(function):
+    # Call a function once under tracemalloc; return its result, the peak bytes it allocated and the bytes still held afterwards
+    tracemalloc.start()
+    try:
+        start, _ = tracemalloc.get_traced_memory()
+        result = function()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, peak - start, current - start
+
+
+# Define a canvas stand-in with a fixed size, so the benchmark uses the GUI's own view geometry without a display
+class StubCanvas:
+    def __init__(self, width, height):
+        self.width, self.height = width, height  # Canvas size in pixels
+
+    def winfo_width(self):
+        return self.width
+
+    def winfo_height(self):
+        return self.height
+
+    def delete(self, *items):
+        pass  # Nothing is ever drawn
+
+
+def time_calls(function, repeat):
+    # Call a function several times and return the durations in seconds
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+def render_display(image, previews, canvas_width, canvas_height, zoom=1.0):
+    # Render every tile a canvas shows for an image or EditPipeline, through the same Viewport as display_image
+    viewport = Viewport(StubCanvas(canvas_width, canvas_height), previews)
+    viewport.set_image(image)
+    viewport.zoom_at(canvas_width / 2, canvas_height / 2, zoom)  # Zoom around the centre, as the mouse wheel does
+    scaled_width, scaled_height, tiles = viewport.layout()
+    for key, x, y in tiles:
+        to_display(viewport.render_pixels(key, scaled_width, scaled_height))
+
+
+def benchmark_image(image, repeat, file_path=None):
+    # Time every operation on one image and track the history memory
+    results = {}
+    canvas_width, canvas_height = CANVAS_SIZE
+    img_height, img_width = image.shape[:2]
+    crop = (img_width // 4, img_height // 4, img_width * 3 // 4, img_height * 3 // 4)  # Central quarter of the image
+
+    def measure(name, function, count=repeat):
+        # Time an operation, then trace one more untimed call for its memory, so tracing does not skew the timings
+        before = rss_mb()
+        durations = time_calls(function, count)
+        rss_delta = rss_mb() - before  # Memory the process kept across the timed calls
+        _, peak, _ = traced(function)
+        results[name] = dict(summarize(durations), peak_alloc_mb=peak / (1024 * 1024), rss_delta_mb=rss_delta)
+
+    if file_path is not None:
+        measure("load", lambda: ops.read_image(file_path))
+    measure("redraw_first", lambda: render_display(image, PreviewCache(), canvas_width, canvas_height), count=1)  # Builds the pyramid
+    previews = PreviewCache()
+    render_display(image, previews, canvas_width, canvas_height)  # Build the pyramid the later redraws start from
+    measure("redraw", lambda: render_display(image, previews, canvas_width, canvas_height))
+    cropped = EditPipeline(image).cropped(*crop)
+    measure("crop", lambda: render_display(EditPipeline(image).cropped(*crop), previews, canvas_width, canvas_height))
+    measure("rotate", lambda: render_display(cropped.rotated(), previews, canvas_width, canvas_height))
+    measure("grayscale", lambda: render_display(cropped.grayscaled(), previews, canvas_width, canvas_height))
+    measure("resize", lambda: render_display(cropped.resized(150), previews, canvas_width, canvas_height))
+    measure("zoom_16x", lambda: render_display(cropped.resized(200), previews, canvas_width, canvas_height, zoom=16))
+    measure("save", lambda: ops.encode_image(cropped.rotated().render(), ".png"))  # Full-resolution render and encode
+
+    # Replay a typical editing session as the GUI does: display each step, then record it in the history.
+    # history_bytes counts the pixel buffers the history references; edits are pipelines holding no pixels, so only
+    # the load adds any. retained_bytes is everything a step leaves allocated, including the previews it caches.
+    history = EditHistory()
+    session = PreviewCache()
+    steps = (("load", None), ("crop", cropped), ("rotate", cropped.rotated()), ("grayscale", cropped.rotated().grayscaled()), ("resize", cropped.rotated().grayscaled().resized(50)))
+    for name, pipeline in steps:
+        before = history.memory_usage()
+
+        def step():
+            # Display the step and record it, keeping whatever the GUI would keep
+            render_display(image if pipeline is None else pipeline, session, canvas_width, canvas_height)
+            history.push(name, {"original_image": image, "pipeline": pipeline} if pipeline is None else {"pipeline": pipeline})
+
+        _, _, retained = traced(step)
+        results.setdefault(name, {}).update(history_bytes=history.memory_usage() - before, retained_bytes=retained)
+    return results
+
+
+def print_results(name, results):
+    # Print the results for one image as a table
+    print(f"\n{name}")
+    print(f"  {'operation':<14}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}{'peak MB':>10}{'RSS +MB':>10}{'history +B':>14}{'retained +B':>14}")
+    for operation, stats in results.items():
+        timing = f"{stats['p50_ms']:>10.1f}{stats['p95_ms']:>10.1f}{stats['max_ms']:>10.1f}{stats['peak_alloc_mb']:>10.1f}{stats['rss_delta_mb']:>10.1f}" if "p50_ms" in stats else " " * 50
+        print(f"  {operation:<14}{timing}{stats.get('history_bytes', ''):>14}{stats.get('retained_bytes', ''):>14}")
+
+
+def main(argv=None):
+    # Parse the command line and run the benchmarks
+    parser = argparse.ArgumentParser(description="Benchmark the image operations and the canvas render path headlessly.")
+    parser.add_argument("--sizes", default=",".join(str(size) for size in DEFAULT_SIZES), help="synthetic image sizes in megapixels, comma separated (empty for none)")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per operation")
+    parser.add_argument("--no-samples", action="store_true", help="skip the sample files in images/")
+    parser.add_argument("--json", help="also write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    report = {}
+    for size in (float(value) for value in args.sizes.split(",") if value):
+        name = f"synthetic {size:g} MP"
+        image = synthetic_image(size)
+        report[name] = benchmark_image(image, args.repeat)
+        print_results(f"{name} ({image.shape[1]}x{image.shape[0]})", report[name])
+        del image  # Free the image before building the next one
+    if not args.no_samples:
+        for file_path in sorted(glob.glob(SAMPLE_IMAGES)):
+            if file_path.lower().endswith(ops.IMAGE_EXTENSIONS):
+                image = ops.read_image(file_path)
+                name = os.path.basename(file_path)
+                report[name] = benchmark_image(image, args.repeat, file_path)
+                print_results(f"{name} ({image.shape[1]}x{image.shape[0]})", report[name])
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(report, file, indent=2)  # Save the results for comparing runs
+
+
+# Entry point of the benchmark
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+# Import necessary libraries
+import math  # Math for rounding source regions
+import cv2  # OpenCV for image processing
+import numpy as np  # NumPy for the affine matrices
+import image_operations as ops  # Image operations shared with the GUI
+
+ROTATE_CODES = {1: cv2.ROTATE_90_CLOCKWISE, 2: cv2.ROTATE_180, 3: cv2.ROTATE_90_COUNTERCLOCKWISE}  # Quarter turns to OpenCV codes
+
+
+def translation(x, y):
+    # Build a matrix that moves points by (x, y)
+    return np.array([[1.0, 0.0, x], [0.0, 1.0, y], [0.0, 0.0, 1.0]])
+
+
+def scaling(x, y):
+    # Build a matrix that scales points by (x, y)
+    return np.array([[x, 0.0, 0.0], [0.0, y, 0.0], [0.0, 0.0, 1.0]])
+
+
+# Define a non-destructive list of edits over a source image
+class EditPipeline:
+    def __init__(self, source, operations=()):
+        self.source = source  # Source image; never modified
+        self.operations = tuple(operations)  # Recorded (name, arguments) steps, as used by recipes
+
+    def append(self, name, *arguments):
+        # Return a new pipeline with one more step
+        return EditPipeline(self.source, self.operations + ((name, arguments),))
+
+    def cropped(self, x1, y1, x2, y2):
+        # Return a new pipeline cropped to a rectangle in the current output coordinates
+        pipeline = self.append("crop", x1, y1, x2, y2)
+        pipeline.fold()  # Validate the cropping area straight away
+        return pipeline
+
+    def resized(self, percent):
+        # Return a new pipeline scaled by a percentage of the size before any resize
+        operations = tuple(step for step in self.operations if step[0] != "resize")  # Uniform scaling commutes with the other steps
+        return EditPipeline(self.source, operations).append("resize", int(percent))
+
+    def resize_percent(self):
+        # Return the percentage of the resize step, or 100 if there is none
+        for name, arguments in self.operations:
+            if name == "resize":
+                return int(arguments[0])  # resized() keeps at most one resize step
+        return 100
+
+    def rotated(self):
+        # Return a new pipeline rotated by 90 degrees clockwise
+        return self.append("rotate")
+
+    def grayscaled(self):
+        # Return a new pipeline converted to grayscale
+        if ("grayscale", ()) in self.operations:
+            return self  # Converting twice changes nothing
+        return self.append("grayscale")
+
+    def with_source(self, source):
+        # Return the same edits applied to another source image
+        return EditPipeline(source, self.operations)
+
+    def fold(self):
+        # Fuse the geometric steps into one matrix from source to output coordinates
+        matrix = np.identity(3)  # Maps continuous source coordinates to output coordinates
+        height, width = self.source.shape[:2]
+        turns = 0  # Number of quarter turns, used to rotate without resampling
+        grayscale = False
+        for name, arguments in self.operations:
+            if name == "crop":
+                x1, y1, x2, y2 = ops.clamp_crop(*arguments, width, height)  # Clamp to the current output size
+                matrix = translation(-x1, -y1) @ matrix
+                width, height = x2 - x1, y2 - y1
+            elif name == "rotate":
+                matrix = np.array([[0.0, -1.0, height], [1.0, 0.0, 0.0], [0.0, 0.0, 1.0]]) @ matrix  # (x, y) -> (h - y, x)
+                width, height = height, width
+                turns = (turns + 1) % 4
+            elif name == "resize":
+                scale = int(arguments[0]) / 100  # Convert the percentage to a scale factor
+                new_width, new_height = max(1, int(width * scale)), max(1, int(height * scale))  # Same sizes as the eager resize
+                matrix = scaling(new_width / width, new_height / height) @ matrix
+                width, height = new_width, new_height
+            elif name == "grayscale":
+                grayscale = True  # Colour steps commute with geometry, so apply them last on fewer pixels
+            else:
+                raise ValueError(f"Unknown operation: {name}")
+        return matrix, (width, height), turns, grayscale
+
+    def output_size(self):
+        # Return the full-resolution output size
+        return self.fold()[1]
+
+    def render(self, max_width=None, max_height=None, pyramid=None):
+        # Render the edits, fitting the result inside max_width x max_height if given
+        width, height = self.output_size()
+        factor = 1.0
+        if max_width:
+            factor = min(factor, max_width / width)  # Shrink to the requested width
+        if max_height:
+            factor = min(factor, max_height / height)  # Shrink to the requested height
+        out_width, out_height = max(1, int(width * factor)), max(1, int(height * factor))
+        return self.render_region(out_width, out_height, 0, 0, out_width, out_height, pyramid)
+
+    def render_region(self, scaled_width, scaled_height, left, top, region_width, region_height, pyramid=None):
+        # Render one rectangle of the output, as if the whole output were scaled to scaled_width x scaled_height
+        matrix, (width, height), turns, grayscale = self.fold()
+        matrix = translation(-left, -top) @ scaling(scaled_width / width, scaled_height / height) @ matrix  # Move the rectangle to the origin
+        out_width, out_height = region_width, region_height
+
+        source = self.source
+        source_height, source_width = source.shape[:2]
+        scale_x = math.hypot(matrix[0, 0], matrix[1, 0])  # Output pixels per source pixel along the source x axis
+        scale_y = math.hypot(matrix[0, 1], matrix[1, 1])  # Output pixels per source pixel along the source y axis
+        if pyramid is not None and (scale_x < 1 or scale_y < 1):
+            source = pyramid.level_for(math.ceil(source_width * scale_x), math.ceil(source_height * scale_y))  # Start from the nearest preview level
+            level_height, level_width = source.shape[:2]
+            matrix = matrix @ scaling(source_width / level_width, source_height / level_height)
+            scale_x, scale_y = scale_x * source_width / level_width, scale_y * source_height / level_height
+
+        # Find the region of the source that ends up in the output
+        inverse = np.linalg.inv(matrix)
+        corners = inverse @ np.array([[0.0, out_width, 0.0, out_width], [0.0, 0.0, out_height, out_height], [1.0, 1.0, 1.0, 1.0]])
+        x0 = max(0, math.floor(corners[0].min() + 1e-6))
+        y0 = max(0, math.floor(corners[1].min() + 1e-6))
+        x1 = min(source.shape[1], math.ceil(corners[0].max() - 1e-6))
+        y1 = min(source.shape[0], math.ceil(corners[1].max() - 1e-6))
+        region = source[y0:y1, x0:x1]  # A view; nothing outside the output is touched
+        matrix = matrix @ translation(x0, y0)
+
+        if scale_x < 1 or scale_y < 1:
+            # Warping cannot average pixels, so shrink with an area filter and then turn without resampling
+            size = (out_height, out_width) if turns % 2 else (out_width, out_height)
+            image = cv2.resize(region, size, interpolation=cv2.INTER_AREA)
+            if turns:
+                image = cv2.rotate(image, ROTATE_CODES[turns])
+        elif scale_x == 1 and scale_y == 1 and all(abs(offset - round(offset)) < 1e-6 for offset in matrix[:2, 2]):
+            # Crops and quarter turns on whole pixels need no resampling at all; a preview level can leave half-pixel offsets
+            image = cv2.rotate(region, ROTATE_CODES[turns]) if turns else region
+        else:
+            # Enlarge with a single affine remap over pixel centres
+            pixel_matrix = translation(-0.5, -0.5) @ matrix @ translation(0.5, 0.5)
+            image = cv2.warpAffine(region, pixel_matrix[:2], (out_width, out_height), flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE)
+
+        if grayscale:
+            image = ops.convert_to_grayscale(image)  # Convert the rendered pixels only
+        return image
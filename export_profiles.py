@@ -0,0 +1,145 @@
+# Import necessary libraries
+import argparse  # Argparse for the command line interface
+import os  # OS for file system paths
+import sys  # Sys for the exit status
+import threading  # Threading for cancellation flags
+import time  # Time for measuring encodes
+from concurrent.futures import ThreadPoolExecutor, CancelledError  # Thread pool for encoding renditions in parallel
+import cv2  # OpenCV for downscaling
+import image_operations as ops  # Image operations shared with the GUI
+from edit_pipeline import EditPipeline  # Fused rendering of a recipe
+
+# Renditions written by an export: (name, longest side in pixels or None for full size, file extension, JPEG quality)
+DEFAULT_PROFILE = (
+    ("full", None, ".png", None),  # Lossless master
+    ("web_q90", 2048, ".jpg", 90),  # Web JPEGs at several quality levels
+    ("web_q75", 2048, ".jpg", 75),
+    ("web_q60", 2048, ".jpg", 60),
+    ("thumb_1024", 1024, ".jpg", 85),  # Thumbnails
+    ("thumb_512", 512, ".jpg", 85),
+    ("thumb_256", 256, ".jpg", 85),
+)
+
+
+def fit_size(width, height, longest_side):
+    # Return the size of an image shrunk so its longest side is at most the given length
+    scale = min(1.0, longest_side / max(width, height))  # Never enlarge
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def scaled_versions(image, profile):
+    # Yield (longest side, pixels) for every size in a profile, largest first, each shrunk from the previous one
+    yield None, image  # Full size
+    img_height, img_width = image.shape[:2]
+    source = image
+    for longest_side in sorted({side for _, side, _, _ in profile if side is not None}, reverse=True):
+        size = fit_size(img_width, img_height, longest_side)  # Sizes come from the full image, so rounding does not add up
+        if size != (source.shape[1], source.shape[0]):
+            source = cv2.resize(source, size, interpolation=cv2.INTER_AREA)  # Shrinking the previous size reads far fewer pixels
+        yield longest_side, source
+
+
+def encode_rendition(image, name, extension, quality, file_path, stop):
+    # Encode and write one rendition, returning its statistics
+    if stop.is_set():
+        raise CancelledError()  # The export was cancelled or another rendition failed
+    start = time.perf_counter()
+    data = ops.encode_image(image, extension, quality)  # Encode in memory
+    encode_seconds = time.perf_counter() - start
+    if stop.is_set():
+        raise CancelledError()
+    temporary_path = file_path + ".part"
+    data.tofile(temporary_path)  # Write next to the destination
+    os.replace(temporary_path, file_path)  # Replace the destination in one step, so it is never half written
+    return {"name": name, "path": file_path, "width": image.shape[1], "height": image.shape[0], "encode_ms": encode_seconds * 1000, "bytes": data.size}
+
+
+def export_renditions(image, output_dir, base_name, profile=DEFAULT_PROFILE, workers=None, cancel_event=None):
+    # Write every rendition of a profile from one image, encoding them in parallel
+    stop = cancel_event or threading.Event()  # Set to stop the remaining renditions
+    os.makedirs(output_dir, exist_ok=True)
+    futures = {}
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1) as executor:  # OpenCV releases the GIL while encoding
+        try:
+            for longest_side, scaled in scaled_versions(image, profile):
+                if stop.is_set():
+                    raise CancelledError()
+                for name, side, extension, quality in profile:
+                    if side == longest_side:
+                        file_path = os.path.join(output_dir, f"{base_name}_{name}{extension}")
+                        futures[name] = executor.submit(encode_rendition, scaled, name, extension, quality, file_path, stop)  # Encode while the next size is shrunk
+            return [futures[name].result() for name, _, _, _ in profile]  # Statistics in profile order
+        except BaseException:
+            stop.set()  # Stop the other renditions before giving up
+            raise
+
+
+def format_report(results):
+    # Return the statistics of an export as a text table
+    lines = [f"{'rendition':<14}{'size':>12}{'encode ms':>11}{'KB':>10}"]
+    for result in results:
+        lines.append(f"{result['name']:<14}{str(result['width']) + 'x' + str(result['height']):>12}{result['encode_ms']:>11.1f}{result['bytes'] / 1024:>10.1f}")
+    return "\n".join(lines)
+
+
+# Define an export of every rendition that can be cancelled, run by the GUI's background workers
+class ExportJob:
+    def __init__(self, output_dir, base_name, render, profile=DEFAULT_PROFILE):
+        self.output_dir = output_dir  # Folder receiving the renditions
+        self.base_name = base_name  # File name shared by the renditions, without suffix or extension
+        self.file_path = os.path.join(output_dir, base_name)  # Name shown in progress messages
+        self.render = render  # Callable producing the pixels to export
+        self.profile = profile  # Renditions to write
+        self.cancel_event = threading.Event()  # Set when the export is cancelled
+        self.future = None  # Future of the running job
+        self.seconds = None  # Time the finished export took
+        self.results = None  # Statistics of each rendition
+
+    def cancel(self):
+        # Cancel the export; a job that has not started is dropped from the queue
+        self.cancel_event.set()
+        if self.future is not None:
+            self.future.cancel()
+
+    def run(self):
+        # Render the edits once at full resolution and write every rendition from them
+        start = time.perf_counter()
+        if self.cancel_event.is_set():
+            raise CancelledError()
+        image = self.render()
+        self.results = export_renditions(image, self.output_dir, self.base_name, self.profile, cancel_event=self.cancel_event)
+        self.seconds = time.perf_counter() - start
+        return self.results
+
+
+def main(argv=None):
+    # Parse the command line and export every input image
+    parser = argparse.ArgumentParser(description="Export full-size, web and thumbnail renditions of images in one pass.")
+    parser.add_argument("inputs", nargs="+", help="image files to export")
+    parser.add_argument("-o", "--output", required=True, help="folder for the renditions")
+    parser.add_argument("-r", "--recipe", default="", help='steps to apply first, e.g. "crop:10,10,200,200 grayscale rotate resize:50"')
+    parser.add_argument("-w", "--workers", type=int, help="number of encoding threads (default: one per core)")
+    args = parser.parse_args(argv)
+
+    try:
+        recipe = ops.parse_recipe(args.recipe)  # Parse the recipe before starting any work
+    except ValueError as error:
+        parser.error(str(error))
+    failures = 0
+    for input_path in args.inputs:
+        try:
+            start = time.perf_counter()
+            image = EditPipeline(ops.read_image(input_path), recipe).render()  # Decode and edit once for every rendition
+            results = export_renditions(image, args.output, os.path.splitext(os.path.basename(input_path))[0], workers=args.workers)
+        except (ValueError, OSError) as error:
+            print(f"{input_path}: {error}", file=sys.stderr)  # Unreadable image, unwritable folder or full disk; carry on with the next input
+            failures += 1
+            continue
+        print(f"{input_path} ({time.perf_counter() - start:.2f} s)")
+        print(format_report(results))  # Report the encode time and size of each rendition
+    return 1 if failures else 0
+
+
+# Entry point of the export tool
+if __name__ == "__main__":
+    sys.exit(main())
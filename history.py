@@ -0,0 +1,107 @@
+# Import necessary libraries
+import numpy as np  # NumPy for measuring the size of image buffers
+
+DEFAULT_MEMORY_BUDGET = 512 * 1024 * 1024  # Default memory budget for the edit history (512 MB)
+
+
+def buffer_owner(array):
+    # Find the array that actually owns the memory behind a (possibly sliced) array
+    while isinstance(array.base, np.ndarray):
+        array = array.base  # Walk up from views to the owning array
+    return array
+
+
+def state_buffers(state):
+    # Collect the memory-owning buffers referenced by a state, keyed by identity
+    buffers = {}
+    for value in state.values():
+        if isinstance(value, np.ndarray):
+            owner = buffer_owner(value)  # Views share the memory of their owner
+            buffers[id(owner)] = owner
+    return buffers
+
+
+# Define a single step in the edit history
+class HistoryStep:
+    def __init__(self, operation, changes, state):
+        self.operation = operation  # Name of the operation that produced this step
+        self.changes = changes  # Names of the state values this step changed
+        self.state = state  # Full state; unchanged values are shared with earlier steps
+
+
+# Define the undo/redo history engine
+class EditHistory:
+    def __init__(self, memory_budget=DEFAULT_MEMORY_BUDGET):
+        self.memory_budget = memory_budget  # Maximum number of bytes the history may hold
+        self.steps = []  # Recorded steps, oldest first
+        self.position = -1  # Index of the step that is currently shown
+
+    def __len__(self):
+        # Return the number of recorded steps
+        return len(self.steps)
+
+    def can_undo(self):
+        # Check if there is a step before the current one
+        return self.position > 0
+
+    def can_redo(self):
+        # Check if there is an undone step after the current one
+        return self.position < len(self.steps) - 1
+
+    def push(self, operation, changes):
+        # Record a new step holding only the values it changed
+        del self.steps[self.position + 1:]  # Discard the steps that could have been redone
+        if self.steps:
+            state = dict(self.current_state())  # Share every unchanged buffer with the previous step
+            state.update(changes)  # Apply the changed values
+        else:
+            state = dict(changes)  # The first step must describe the complete state
+        self.steps.append(HistoryStep(operation, tuple(changes), state))  # Add the step
+        self.position = len(self.steps) - 1  # Move to the new step
+        self.enforce_budget()  # Evict old steps if the budget is exceeded
+
+    def clear(self):
+        # Remove every recorded step
+        self.steps = []
+        self.position = -1
+
+    def undo(self):
+        # Step back and return the previous state
+        if not self.can_undo():
+            return None
+        self.position -= 1  # Move one step back
+        return self.current_state()
+
+    def redo(self):
+        # Step forward and return the next state
+        if not self.can_redo():
+            return None
+        self.position += 1  # Move one step forward
+        return self.current_state()
+
+    def states(self):
+        # Return every recorded state, oldest first
+        return [step.state for step in self.steps]
+
+    def current_state(self):
+        # Return the state of the current step
+        if self.position < 0:
+            return None
+        return self.steps[self.position].state
+
+    def memory_usage(self):
+        # Count the bytes held by the history, counting shared buffers only once
+        buffers = {}
+        for step in self.steps:
+            buffers.update(state_buffers(step.state))  # Shared buffers collapse onto one key
+        return sum(buffer.nbytes for buffer in buffers.values())
+
+    def enforce_budget(self):
+        # Keep the history within its memory budget
+        while self.memory_usage() > self.memory_budget and self.position > 0:
+            self.evict_oldest()  # Forget the oldest steps until the history fits
+
+    def evict_oldest(self):
+        # Forget the oldest step; every state is complete, so the next one stands alone
+        del self.steps[0]  # Remove the oldest step
+        self.position -= 1  # Keep pointing at the same step
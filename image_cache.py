@@ -0,0 +1,100 @@
+# Import necessary libraries
+import hashlib  # Hashlib for content hashes
+import os  # OS for file system paths
+import shutil  # Shutil for removing cache entries
+import tempfile  # Tempfile for writing entries before publishing them
+import numpy as np  # NumPy for raw, memory-mappable pixel files
+import image_operations as ops  # Image operations shared with the GUI
+from preview_cache import PreviewPyramid  # Preview levels stored alongside the pixels
+
+CACHE_VERSION = "1"  # Changing the stored format invalidates old entries
+DEFAULT_CACHE_DIR = os.environ.get("IMAGE_APP_CACHE_DIR") or os.path.join(os.path.expanduser("~"), ".cache", "hit137-image-app")  # Shared by the GUI and the batch tools
+DEFAULT_SIZE_LIMIT = 2 * 1024 * 1024 * 1024  # Default size cap of the cache (2 GB)
+SMALLEST_LEVEL = 256  # Preview levels are stored down to about this many pixels across
+HASH_CHUNK_SIZE = 1024 * 1024  # Bytes read at a time while hashing a file
+
+
+# Define an on-disk cache of decoded images keyed by file content
+class DecodedImageCache:
+    def __init__(self, directory=DEFAULT_CACHE_DIR, size_limit=DEFAULT_SIZE_LIMIT):
+        self.directory = directory  # Folder holding one subfolder per cached image
+        self.size_limit = size_limit  # Maximum number of bytes the cache may use
+
+    def key_for(self, file_path):
+        # Build the cache key from the file content and modification time
+        digest = hashlib.sha256(CACHE_VERSION.encode())
+        digest.update(str(os.stat(file_path).st_mtime_ns).encode())  # A touched file is decoded again
+        with open(file_path, "rb") as file:
+            for chunk in iter(lambda: file.read(HASH_CHUNK_SIZE), b""):
+                digest.update(chunk)  # Hashing is much cheaper than decoding
+        return digest.hexdigest()
+
+    def get(self, key):
+        # Return the mapped pixels and preview levels of an entry, or None if it is not cached
+        entry = os.path.join(self.directory, key)
+        try:
+            pixels = np.load(os.path.join(entry, "pixels.npy"), mmap_mode="r")  # Map the pixels without copying or decoding
+            levels = [np.load(os.path.join(entry, f"level_{index}.npy"), mmap_mode="r") for index in range(1, len(os.listdir(entry)))]
+            os.utime(entry)  # Mark the entry as recently used
+            return pixels, levels
+        except (OSError, ValueError):
+            return None  # Not cached, or evicted while being read
+
+    def probe(self, file_path):
+        # Return the key of a file and its cached (pixels, levels), or None on a miss; costs a hash, never a decode
+        key = self.key_for(file_path)
+        return key, self.get(key)
+
+    def load(self, file_path, key=None):
+        # Return the decoded image and its preview levels, mapping them from the cache when possible
+        key = key or self.key_for(file_path)  # A key from probe() saves hashing the file again
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+        entry = os.path.join(self.directory, key)
+        image = ops.read_image(file_path)  # Decode the image
+        pyramid = PreviewPyramid(image)
+        pyramid.level_for(min(SMALLEST_LEVEL, image.shape[1]), min(SMALLEST_LEVEL, image.shape[0]))  # Build the preview levels once
+        levels = pyramid.levels[1:]
+        self.store(entry, image, levels)
+        return image, levels
+
+    def store(self, entry, image, levels):
+        # Write an entry to a temporary folder, then publish it in one step
+        temporary = None
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            temporary = tempfile.mkdtemp(dir=self.directory, prefix=".tmp-")
+            np.save(os.path.join(temporary, "pixels.npy"), image)
+            for index, level in enumerate(levels, start=1):
+                np.save(os.path.join(temporary, f"level_{index}.npy"), level)
+            os.rename(temporary, entry)  # Readers never see a half-written entry
+        except OSError:
+            if temporary is not None:
+                shutil.rmtree(temporary, ignore_errors=True)  # Another process stored it first, or the disk is full
+            return  # Caching is only an optimisation, so the image is still returned
+        self.evict()
+
+    def entries(self):
+        # Return (last used, size, path) for every published entry
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.startswith("."):
+                continue  # Skip entries still being written
+            path = os.path.join(self.directory, name)
+            try:
+                size = sum(entry.stat().st_size for entry in os.scandir(path))
+                entries.append((os.stat(path).st_mtime, size, path))
+            except OSError:
+                pass  # Removed by another process meanwhile
+        return entries
+
+    def evict(self):
+        # Remove the least recently used entries until the cache fits its size cap
+        entries = sorted(self.entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.size_limit:
+                break
+            shutil.rmtree(path, ignore_errors=True)  # Mapped files stay readable until they are closed
+            total -= size
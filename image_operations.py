@@ -0,0 +1,105 @@
+# Import necessary libraries
+import os  # OS for file system paths
+import cv2  # OpenCV for image processing
+import numpy as np  # NumPy for converting pixel depths
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp")  # File types the application can open
+JPEG_EXTENSIONS = (".jpg", ".jpeg")  # File types that can be decoded at reduced resolution cheaply
+
+
+def read_image(file_path):
+    # Load an image in its native format: 1-channel gray, BGR or BGRA, 8 or 16 bits
+    if file_path.lower().endswith(JPEG_EXTENSIONS):
+        flags = cv2.IMREAD_ANYCOLOR | cv2.IMREAD_ANYDEPTH  # JPEGs have no alpha; keep gray and the EXIF orientation
+    else:
+        flags = cv2.IMREAD_UNCHANGED  # Keep alpha and 16-bit depth
+    image = cv2.imread(file_path, flags)  # Read the image using OpenCV
+    if image is None:
+        raise ValueError(f"Failed to load image: {file_path}")  # Raise an error if image loading fails
+    return image
+
+
+def read_preview(file_path):
+    # Quickly decode a JPEG at a quarter of its resolution
+    image = cv2.imread(file_path, cv2.IMREAD_REDUCED_COLOR_4)  # The JPEG decoder skips most of the work
+    if image is None:
+        raise ValueError(f"Failed to load image: {file_path}")  # Raise an error if image loading fails
+    return image
+
+
+def to_8bit(image):
+    # Reduce 16-bit pixels to 8 bits for formats and displays that need it
+    if image.dtype == np.uint16:
+        return (image >> 8).astype(np.uint8)  # Keep the most significant byte
+    return image
+
+
+def to_bgr(image):
+    # Expand an image to 8-bit BGR, for outputs that accept nothing else such as video
+    image = to_8bit(image)
+    if image.ndim == 2:
+        return cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)  # Expand gray
+    if image.shape[2] == 4:
+        return cv2.cvtColor(image, cv2.COLOR_BGRA2BGR)  # Drop alpha
+    return image
+
+
+def encode_image(image, extension, quality=None):
+    # Encode an image in memory in the format given by a file extension, converting only what the format cannot hold
+    params = []  # Encoder options
+    if extension.lower() in JPEG_EXTENSIONS:
+        image = to_8bit(image)  # JPEG holds only 8-bit pixels
+        if image.ndim == 3 and image.shape[2] == 4:
+            image = cv2.cvtColor(image, cv2.COLOR_BGRA2BGR)  # JPEG has no alpha
+        if quality is not None:
+            params = [cv2.IMWRITE_JPEG_QUALITY, int(quality)]  # JPEG quality from 0 to 100
+    elif extension.lower() == ".bmp":
+        image = to_8bit(image)  # BMP holds only 8-bit pixels
+    success, data = cv2.imencode(extension, image, params)
+    if not success:
+        raise ValueError(f"Failed to encode image as {extension}")  # Raise an error if encoding fails
+    return data
+
+
+def write_image(file_path, image):
+    # Save an image to the file system
+    encode_image(image, os.path.splitext(file_path)[1] or ".png").tofile(file_path)  # Encode and write the file
+
+
+def clamp_crop(x1, y1, x2, y2, width, height):
+    # Clamp a cropping rectangle to an image of the given size; the end coordinates are exclusive
+    x1 = max(0, min(x1, width - 1))  # Ensure x1 is within the image bounds
+    y1 = max(0, min(y1, height - 1))  # Ensure y1 is within the image bounds
+    x2 = max(0, min(x2, width))  # Ensure x2 is within the image bounds; it may reach the right edge
+    y2 = max(0, min(y2, height))  # Ensure y2 is within the image bounds; it may reach the bottom edge
+    if x1 >= x2 or y1 >= y2:
+        raise ValueError("Invalid cropping area.")  # Raise an error if the cropping area is invalid
+    return x1, y1, x2, y2
+
+
+def convert_to_grayscale(image):
+    # Convert an image to single-channel grayscale, keeping alpha if there is any
+    if image.ndim == 2:
+        return image  # Already grayscale
+    if image.shape[2] == 4:
+        gray = cv2.cvtColor(image, cv2.COLOR_BGRA2GRAY)  # Convert to grayscale
+        return cv2.merge((gray, gray, gray, image[:, :, 3]))  # OpenCV cannot store gray with alpha, so keep BGRA
+    return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)  # Convert to grayscale
+
+
+ARGUMENT_COUNTS = {"crop": 4, "resize": 1, "grayscale": 0, "rotate": 0}  # Recipe steps and the number of arguments each takes; EditPipeline runs them
+
+
+def parse_recipe(text):
+    # Parse a recipe such as "crop:10,10,200,200 grayscale rotate resize:50" into steps
+    recipe = []
+    for token in text.replace(";", " ").split():
+        name, _, arguments = token.partition(":")  # Split the step name from its arguments
+        if name not in ARGUMENT_COUNTS:
+            raise ValueError(f"Unknown operation: {name}")  # Raise an error for unknown steps
+        arguments = tuple(int(value) for value in arguments.split(",") if value)  # Parse the step arguments
+        if len(arguments) != ARGUMENT_COUNTS[name]:
+            raise ValueError(f"{name} takes {ARGUMENT_COUNTS[name]} argument(s)")  # Raise an error for a malformed step
+        recipe.append((name, arguments))  # Store the step
+    return recipe
+
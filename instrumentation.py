@@ -0,0 +1,61 @@
+# Import necessary libraries
+import functools  # Functools for wrapping callbacks
+import json  # JSON for dumping timings
+import math  # Math for percentiles
+import time  # Time for measuring callbacks
+from collections import defaultdict  # Default dictionary for grouping samples
+
+
+def percentile(values, fraction):
+    # Return the value below which the given fraction of the sorted values fall
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))  # Nearest-rank percentile
+    return ordered[index]
+
+
+def summarize(samples):
+    # Summarize a list of durations in seconds as millisecond statistics
+    return {
+        "count": len(samples),
+        "p50_ms": percentile(samples, 0.50) * 1000,
+        "p95_ms": percentile(samples, 0.95) * 1000,
+        "max_ms": max(samples) * 1000,
+        "total_ms": sum(samples) * 1000,
+    }
+
+
+# Define a recorder of per-callback timings
+class Timings:
+    def __init__(self):
+        self.samples = defaultdict(list)  # Durations in seconds keyed by callback name
+
+    def record(self, name, seconds):
+        # Store one duration
+        self.samples[name].append(seconds)
+
+    def wrap(self, name, function):
+        # Return a callback that records how long each call takes
+        @functools.wraps(function)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.record(name, time.perf_counter() - start)  # Record even if the callback fails
+        return timed
+
+    def summary(self):
+        # Return statistics for every callback that was called
+        return {name: summarize(samples) for name, samples in sorted(self.samples.items())}
+
+    def format(self):
+        # Return the statistics as a text table
+        lines = [f"{'callback':<16}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}"]
+        for name, stats in self.summary().items():
+            lines.append(f"{name:<16}{stats['count']:>7}{stats['p50_ms']:>10.1f}{stats['p95_ms']:>10.1f}{stats['max_ms']:>10.1f}")
+        return "\n".join(lines)
+
+    def dump(self, file_path):
+        # Write the statistics and raw samples to a JSON file
+        with open(file_path, "w") as file:
+            json.dump({"summary": self.summary(), "samples_ms": {name: [value * 1000 for value in samples] for name, samples in self.samples.items()}}, file, indent=2)
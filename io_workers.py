@@ -0,0 +1,101 @@
+# Import necessary libraries
+import os  # OS for file system paths
+import queue  # Queue for handing results back to the Tk thread
+import threading  # Threading for cancellation flags
+import time  # Time for measuring saves
+from concurrent.futures import ThreadPoolExecutor, CancelledError  # Thread pool for background work
+import image_operations as ops  # Image operations shared with the batch tool
+
+DEFAULT_WORKERS = 2  # Enough for a preview decode and a full decode to run side by side
+DEFAULT_SAVE_WORKERS = 2  # Saves and exports get their own threads, so they never hold up a load
+POLL_INTERVAL_MS = 30  # How often the Tk thread checks for finished work
+
+
+# Define a pool of background workers whose results are delivered on the Tk thread
+class BackgroundWorkers:
+    def __init__(self, root, max_workers=DEFAULT_WORKERS, max_save_workers=DEFAULT_SAVE_WORKERS):
+        self.root = root  # Tk root used to schedule polling
+        self.executors = {
+            "load": ThreadPoolExecutor(max_workers=max_workers),  # OpenCV releases the GIL while decoding and encoding
+            "save": ThreadPoolExecutor(max_workers=max_save_workers),  # Long saves and exports queue here, apart from loads
+        }
+        self.results = queue.Queue()  # Finished work, filled by the worker threads
+        self.outstanding = 0  # Number of submitted jobs not yet delivered
+        self.poll_job = None  # Pending poll scheduled with root.after
+
+    def submit(self, function, *args, on_done=None, on_error=None, kind="load"):
+        # Run a function on the "load" or "save" workers; callbacks run later on the Tk thread
+        future = self.executors[kind].submit(function, *args)
+        future.add_done_callback(lambda done: self.results.put((done, on_done, on_error)))  # Only touch the thread-safe queue here
+        self.outstanding += 1
+        self.schedule_poll()
+        return future
+
+    def schedule_poll(self):
+        # Make sure the results queue will be checked
+        if self.poll_job is None:
+            self.poll_job = self.root.after(POLL_INTERVAL_MS, self.poll)
+
+    def poll(self):
+        # Deliver finished work to its callbacks on the Tk thread
+        self.poll_job = None
+        while True:
+            try:
+                future, on_done, on_error = self.results.get_nowait()
+            except queue.Empty:
+                break
+            self.outstanding -= 1
+            if future.cancelled():
+                error = CancelledError()  # The job was cancelled before it started
+            else:
+                error = future.exception()
+            if error is None:
+                if on_done is not None:
+                    on_done(future.result())
+            elif on_error is not None:
+                on_error(error)
+        if self.outstanding:
+            self.schedule_poll()  # Keep polling while work is in flight
+
+    def shutdown(self):
+        # Stop the workers, dropping work that has not started
+        for executor in self.executors.values():
+            executor.shutdown(wait=False, cancel_futures=True)
+        if self.poll_job is not None:
+            self.root.after_cancel(self.poll_job)
+            self.poll_job = None
+
+
+# Define a save that can be cancelled until its file is written
+class SaveJob:
+    def __init__(self, file_path, render):
+        self.file_path = file_path  # Destination file
+        self.render = render  # Callable producing the pixels to save
+        self.cancel_event = threading.Event()  # Set when the save is cancelled
+        self.future = None  # Future of the running job
+        self.seconds = None  # Time the finished save took
+
+    def cancel(self):
+        # Cancel the save; a job that has not started is dropped from the queue
+        self.cancel_event.set()
+        if self.future is not None:
+            self.future.cancel()
+
+    def check_cancelled(self):
+        # Stop the job if it was cancelled
+        if self.cancel_event.is_set():
+            raise CancelledError()
+
+    def run(self):
+        # Render, encode and write the image, checking for cancellation between steps
+        start = time.perf_counter()
+        self.check_cancelled()
+        image = self.render()  # Render the edits at full resolution
+        self.check_cancelled()
+        data = ops.encode_image(image, os.path.splitext(self.file_path)[1] or ".png")  # Encode in memory
+        self.check_cancelled()
+        temporary_path = self.file_path + ".part"
+        data.tofile(temporary_path)  # Write next to the destination
+        os.replace(temporary_path, self.file_path)  # Replace the destination in one step, so it is never half written
+        self.seconds = time.perf_counter() - start
+        return self.file_path
@@ -0,0 +1,71 @@
+# Import necessary libraries
+from collections import OrderedDict  # Ordered dictionary for least-recently-used bookkeeping
+import cv2  # OpenCV for image processing
+from PIL import Image  # PIL for image manipulation and display
+import image_operations as ops  # Image operations shared with the batch tool
+
+MAX_CACHED_IMAGES = 6  # Number of images whose previews are kept (both canvases plus undo/redo neighbours)
+
+
+def to_display(image):
+    # Convert native pixels to an 8-bit PIL image for display; only the displayed pixels are expanded
+    image = ops.to_8bit(image)
+    if image.ndim == 2:
+        return Image.fromarray(image)  # Gray is shown as it is
+    if image.shape[2] == 4:
+        return Image.fromarray(cv2.cvtColor(image, cv2.COLOR_BGRA2RGBA))  # Keep transparency
+    return Image.fromarray(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))  # Convert from BGR to RGB
+
+
+# Define a lazily built pyramid of downscaled previews of one image
+class PreviewPyramid:
+    def __init__(self, image, levels=()):
+        self.image = image  # Full-resolution image; holding it keeps its identity unique
+        self.levels = [image, *levels]  # Level n is the image downscaled by a factor of 2**n; some may be precomputed
+
+    def level_for(self, width, height):
+        # Return the smallest level that is still at least the requested size
+        level = self.levels[0]
+        index = 0
+        while True:
+            if index + 1 < len(self.levels):
+                candidate = self.levels[index + 1]  # Use the already built level
+            else:
+                level_height, level_width = level.shape[:2]
+                if level_width // 2 < width or level_height // 2 < height:
+                    return level  # Halving again would drop below the target size
+                candidate = cv2.resize(level, (level_width // 2, level_height // 2), interpolation=cv2.INTER_AREA)  # Build the next level
+                self.levels.append(candidate)
+            if candidate.shape[1] < width or candidate.shape[0] < height:
+                return level  # The next level is too small
+            level = candidate
+            index += 1
+
+
+# Define a cache of preview pyramids for recently displayed images
+class PreviewCache:
+    def __init__(self, max_images=MAX_CACHED_IMAGES):
+        self.max_images = max_images  # Number of pyramids to keep
+        self.pyramids = OrderedDict()  # Pyramids keyed by the identity of their image
+
+    def pyramid(self, image, levels=()):
+        # Return the pyramid of an image, starting it from any precomputed levels on first use
+        key = id(image)  # Edits always create new arrays, so identity works as the image version
+        pyramid = self.pyramids.get(key)
+        if pyramid is None or pyramid.image is not image:
+            pyramid = PreviewPyramid(image, levels)  # Start a new pyramid for a new image version
+            self.pyramids[key] = pyramid
+            if len(self.pyramids) > self.max_images:
+                self.pyramids.popitem(last=False)  # Forget the least recently used image
+        self.pyramids.move_to_end(key)  # Mark the pyramid as recently used
+        return pyramid
+
+    def retain(self, images):
+        # Forget the pyramids of images that are no longer in use, so they do not keep full-resolution pixels alive
+        keep = {id(image) for image in images}
+        for key in [key for key in self.pyramids if key not in keep]:
+            del self.pyramids[key]
+
+    def clear(self):
+        # Forget every cached pyramid
+        self.pyramids.clear()
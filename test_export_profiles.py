@@ -0,0 +1,45 @@
+# Import necessary libraries
+import os  # OS for file system paths
+import threading  # Threading for cancelling an export
+from concurrent.futures import CancelledError  # Raised by cancelled exports
+import numpy as np  # NumPy for test images
+import pytest  # Pytest for checking raised errors
+import image_operations as ops  # Image operations shared with the GUI
+from export_profiles import DEFAULT_PROFILE, fit_size, scaled_versions, export_renditions  # Multi-target export
+from test_image_tools import sample_image  # Reproducible test images
+
+
+def test_scaled_versions_shrink_in_steps():
+    # Every size comes largest first at the size computed from the full image, and sizes the image already fits share its pixels
+    image = sample_image(3000, 2000)
+    versions = list(scaled_versions(image, DEFAULT_PROFILE))
+    assert [side for side, _ in versions] == [None, 2048, 1024, 512, 256]
+    assert versions[0][1] is image
+    for side, scaled in versions[1:]:
+        assert (scaled.shape[1], scaled.shape[0]) == fit_size(3000, 2000, side)
+    small = sample_image(600, 400)
+    versions = dict(scaled_versions(small, DEFAULT_PROFILE))
+    assert versions[2048] is small and versions[1024] is small
+    assert versions[512].shape[:2] == (341, 512)
+
+
+def test_export_writes_every_rendition(tmp_path):
+    # Each rendition is written at its size and reported in profile order
+    image = sample_image(1200, 800)
+    results = export_renditions(image, str(tmp_path), "photo", workers=2)
+    assert [result["name"] for result in results] == [name for name, _, _, _ in DEFAULT_PROFILE]
+    for result, (name, side, extension, _) in zip(results, DEFAULT_PROFILE):
+        assert result["path"] == os.path.join(tmp_path, f"photo_{name}{extension}")
+        assert os.path.getsize(result["path"]) == result["bytes"]
+        written = ops.read_image(result["path"])
+        assert (written.shape[1], written.shape[0]) == (result["width"], result["height"]) == fit_size(1200, 800, side or 1200)
+    assert not [file_name for file_name in os.listdir(tmp_path) if file_name.endswith(".part")]
+
+
+def test_cancelled_export_stops(tmp_path):
+    # A cancelled export raises instead of writing any rendition
+    cancel_event = threading.Event()
+    cancel_event.set()
+    with pytest.raises(CancelledError):
+        export_renditions(np.zeros((64, 64, 3), np.uint8), str(tmp_path), "photo", cancel_event=cancel_event)
+    assert not os.listdir(tmp_path)
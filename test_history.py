@@ -0,0 +1,28 @@
+# Import necessary libraries
+from edit_pipeline import EditPipeline  # Non-destructive edits rendered on demand
+from history import EditHistory  # Memory-bounded undo/redo history
+from test_image_tools import sample_image  # Reproducible test images
+
+
+def test_history_evicts_oldest_steps_over_budget():
+    # Old steps are forgotten once their buffers exceed the budget, but the current step stays
+    images = [sample_image(100, 100, seed) for seed in range(5)]
+    history = EditHistory(memory_budget=images[0].nbytes * 3)
+    for image in images:
+        history.push("load", {"original_image": image, "pipeline": None})
+    assert len(history) == 3
+    assert history.memory_usage() <= history.memory_budget
+    assert history.undo()["original_image"] is images[3]
+    assert history.undo()["original_image"] is images[2]
+    assert not history.can_undo()
+
+
+def test_history_shares_unchanged_buffers():
+    # Steps that only change the edits add no pixel memory
+    image = sample_image()
+    history = EditHistory()
+    history.push("load", {"original_image": image, "pipeline": None})
+    before = history.memory_usage()
+    history.push("rotate", {"pipeline": EditPipeline(image).rotated()})
+    assert history.memory_usage() == before
+    assert history.current_state()["original_image"] is image
@@ -0,0 +1,18 @@
+# Import necessary libraries
+import os  # OS for file system paths
+import numpy as np  # NumPy for comparing pixels
+import image_operations as ops  # Image operations shared with the GUI
+from image_cache import DecodedImageCache  # On-disk cache of decoded images
+from test_image_tools import sample_image  # Reproducible test images
+
+
+def test_image_cache_maps_stored_pixels(tmp_path):
+    # A second load maps the stored pixels instead of decoding the file again
+    file_path = os.path.join(tmp_path, "image.png")
+    ops.write_image(file_path, sample_image())
+    cache = DecodedImageCache(os.path.join(tmp_path, "cache"))
+    image, levels = cache.load(file_path)
+    cached, cached_levels = cache.load(file_path)
+    assert isinstance(cached, np.memmap)
+    np.testing.assert_array_equal(cached, image)
+    assert len(cached_levels) == len(levels)
@@ -0,0 +1,29 @@
+# Import necessary libraries
+import os  # OS for file system paths
+import cv2  # OpenCV for decoding encoded images
+import numpy as np  # NumPy for test images
+import image_operations as ops  # Image operations shared with the GUI
+from edit_pipeline import EditPipeline  # Non-destructive edits rendered on demand
+
+
+def test_jpeg_drops_depth_and_alpha_only():
+    # JPEG output reduces 16-bit pixels to 8 bits and drops alpha, keeping one channel for gray
+    deep = np.full((16, 16, 3), 200 << 8, np.uint16)
+    decoded = cv2.imdecode(ops.encode_image(deep, ".jpg", 95), cv2.IMREAD_UNCHANGED)
+    assert decoded.dtype == np.uint8 and decoded.shape == (16, 16, 3)
+    assert abs(int(decoded.mean()) - 200) <= 2
+    transparent = np.full((16, 16, 4), 100, np.uint8)
+    assert cv2.imdecode(ops.encode_image(transparent, ".jpg"), cv2.IMREAD_UNCHANGED).shape == (16, 16, 3)
+    gray = np.full((16, 16), 50, np.uint8)
+    assert cv2.imdecode(ops.encode_image(gray, ".jpg"), cv2.IMREAD_UNCHANGED).shape == (16, 16)
+
+
+def test_png_keeps_native_format(tmp_path):
+    # PNG files keep gray, 16-bit and alpha pixels unchanged through edits and back
+    for image in (np.arange(64, dtype=np.uint8).reshape(8, 8), np.arange(64 * 3, dtype=np.uint16).reshape(8, 8, 3) * 300, np.arange(64 * 4, dtype=np.uint8).reshape(8, 8, 4)):
+        file_path = os.path.join(tmp_path, "image.png")
+        ops.write_image(file_path, EditPipeline(image).rotated().render())
+        loaded = ops.read_image(file_path)
+        assert loaded.dtype == image.dtype
+        np.testing.assert_array_equal(loaded, cv2.rotate(image, cv2.ROTATE_90_CLOCKWISE))
+    assert EditPipeline(np.zeros((8, 8, 3), np.uint8)).grayscaled().render().ndim == 2
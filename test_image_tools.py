@@ -0,0 +1,100 @@
+# Import necessary libraries
+import os  # OS for file system paths
+import cv2  # OpenCV for the eager reference operations
+import numpy as np  # NumPy for test images
+import pytest  # Pytest for checking raised errors
+import image_operations as ops  # Image operations shared with the GUI
+from batch_process import plan_outputs  # Output names of the batch tool
+from edit_pipeline import EditPipeline  # Non-destructive edits rendered on demand
+from preview_cache import PreviewCache, PreviewPyramid  # Preview levels used for downscaled renders
+
+
+def sample_image(width=320, height=240, seed=0):
+    # Build a reproducible colour image with structure in both directions
+    rng = np.random.default_rng(seed)
+    return rng.integers(0, 256, size=(height, width, 3), dtype=np.uint8)
+
+
+def eager(image, operations):
+    # Apply recipe steps one at a time to full pixels, as the original application did
+    for name, arguments in operations:
+        if name == "crop":
+            x1, y1, x2, y2 = ops.clamp_crop(*arguments, image.shape[1], image.shape[0])
+            image = image[y1:y2, x1:x2]
+        elif name == "resize":
+            scale = arguments[0] / 100
+            size = (max(1, int(image.shape[1] * scale)), max(1, int(image.shape[0] * scale)))
+            image = cv2.resize(image, size, interpolation=cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR)
+        elif name == "rotate":
+            image = cv2.rotate(image, cv2.ROTATE_90_CLOCKWISE)
+        elif name == "grayscale":
+            image = ops.convert_to_grayscale(image)
+    return image
+
+
+def test_render_matches_eager_crop_rotate_grayscale():
+    # Crops, quarter turns and grayscale need no resampling, so the pixels must be identical
+    image = sample_image()
+    recipe = ops.parse_recipe("crop:20,10,200,150 rotate rotate rotate grayscale")
+    np.testing.assert_array_equal(EditPipeline(image, recipe).render(), eager(image, recipe))
+
+
+def test_render_matches_eager_resize():
+    # Shrinking and enlarging fused with crops and turns stay within rounding of the eager steps
+    image = sample_image()
+    for recipe in ("crop:20,10,200,150 resize:50 rotate", "rotate crop:10,10,120,200 resize:150"):
+        steps = ops.parse_recipe(recipe)
+        rendered, expected = EditPipeline(image, steps).render(), eager(image, steps)
+        assert rendered.shape == expected.shape
+        assert np.abs(rendered.astype(int) - expected.astype(int)).max() <= 1
+
+
+def test_crop_reaches_image_edges():
+    # The exclusive end of a crop may equal the image size
+    image = sample_image(600, 1000)
+    assert EditPipeline(image).cropped(0, 50, 600, 1000).render().shape[:2] == (950, 600)
+    assert EditPipeline(image).cropped(0, 50, 9999, 9999).render().shape[:2] == (950, 600)
+
+
+def test_render_fits_requested_size():
+    # Preview renders shrink to fit the canvas and keep the aspect ratio
+    image = sample_image(800, 400)
+    assert EditPipeline(image).rotated().render(100, 100).shape[:2] == (100, 50)
+
+
+def test_render_region_shapes_with_pyramid():
+    # Regions rendered from a preview level have the requested size; outside pixels reach at most the edge pixel a level straddles
+    image = np.zeros((1000, 1400, 3), np.uint8)
+    image[7:907, 3:1203] = 200  # Only the cropped area is bright
+    pyramid = PreviewPyramid(image)
+    pipeline = EditPipeline(image, ops.parse_recipe("crop:3,7,1203,907"))  # Odd offsets fall between pixels of level 1
+    for scaled_width, scaled_height, left, top, region_width, region_height in ((600, 450, 0, 0, 600, 450), (600, 450, 256, 0, 256, 256), (601, 450, 512, 256, 89, 194), (300, 225, 0, 0, 300, 225)):
+        region = pipeline.render_region(scaled_width, scaled_height, left, top, region_width, region_height, pyramid)
+        assert region.shape[:2] == (region_height, region_width)
+        inner = region[1 if top == 0 else 0:region_height - (1 if top + region_height == scaled_height else 0), 1 if left == 0 else 0:region_width - (1 if left + region_width == scaled_width else 0)]
+        assert inner.min() >= 199
+    assert pipeline.rotated().render_region(450, 600, 0, 0, 450, 600, pyramid).shape[:2] == (600, 450)
+
+
+def test_preview_cache_forgets_unused_images():
+    # Pyramids of images no longer in use are dropped, so they do not keep full-resolution pixels alive
+    images = [sample_image(64, 64, seed) for seed in range(3)]
+    previews = PreviewCache()
+    for image in images:
+        previews.pyramid(image)
+    previews.retain(images[1:])
+    assert [id(pyramid.image) for pyramid in previews.pyramids.values()] == [id(image) for image in images[1:]]
+
+
+def test_batch_refuses_to_overwrite_inputs_or_clash(tmp_path):
+    # Outputs may not replace their inputs unless asked, and two inputs may never share an output
+    for folder in ("a", "b"):
+        os.makedirs(os.path.join(tmp_path, folder))
+        ops.write_image(os.path.join(tmp_path, folder, "image.png"), sample_image())
+    first, second = os.path.join(tmp_path, "a", "image.png"), os.path.join(tmp_path, "b", "image.png")
+    with pytest.raises(ValueError):
+        plan_outputs([first], os.path.join(tmp_path, "a"))
+    assert plan_outputs([first], os.path.join(tmp_path, "a"), overwrite=True)[first] == first
+    assert plan_outputs([first], os.path.join(tmp_path, "a"), ".jpg")[first] == os.path.join(tmp_path, "a", "image.jpg")
+    with pytest.raises(ValueError):
+        plan_outputs([first, second], os.path.join(tmp_path, "out"))
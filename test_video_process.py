@@ -0,0 +1,35 @@
+# Import necessary libraries
+import os  # OS for file system paths
+import threading  # Threading for cancelling an export
+from concurrent.futures import CancelledError  # Raised by cancelled exports
+import cv2  # OpenCV for reading and writing frames
+import numpy as np  # NumPy for test frames
+import pytest  # Pytest for checking raised errors
+from video_process import process_video, partial_path, REPORT_EVERY  # Streaming video processing
+
+
+def test_video_frames_keep_their_order(tmp_path):
+    # Frames edited on several threads are written in their original order
+    for index in range(24):
+        cv2.imwrite(os.path.join(tmp_path, f"in_{index:03d}.png"), np.full((8, 16, 3), index * 10, np.uint8))
+    frames, _ = process_video(os.path.join(tmp_path, "in_%03d.png"), os.path.join(tmp_path, "out_%03d.png"), [("rotate", ())], workers=4, queue_size=2, report=lambda message: None)
+    assert frames == 24
+    for index in range(24):
+        frame = cv2.imread(os.path.join(tmp_path, f"out_{index:03d}.png"))
+        assert frame.shape == (16, 8, 3)
+        assert frame[0, 0, 0] == index * 10
+
+
+def test_cancelled_video_keeps_the_destination(tmp_path):
+    # A video cancelled half way leaves the previous file in place and no partial file behind
+    for index in range(REPORT_EVERY * 2):
+        cv2.imwrite(os.path.join(tmp_path, f"in_{index:03d}.png"), np.full((8, 16, 3), index, np.uint8))
+    destination = os.path.join(tmp_path, "out.avi")
+    with open(destination, "wb") as file:
+        file.write(b"previous export")
+    cancel_event = threading.Event()
+    with pytest.raises(CancelledError):
+        process_video(os.path.join(tmp_path, "in_%03d.png"), destination, [], fourcc="MJPG", cancel_event=cancel_event, report=lambda message: cancel_event.set())
+    with open(destination, "rb") as file:
+        assert file.read() == b"previous export"
+    assert not os.path.exists(partial_path(destination))
@@ -0,0 +1,233 @@
+# Import necessary libraries
+import argparse  # Argparse for the command line interface
+import os  # OS for file system paths
+import queue  # Queue for passing frames between stages
+import sys  # Sys for the exit status
+import threading  # Threading for the pipeline stages
+import time  # Time for measuring throughput
+from concurrent.futures import CancelledError  # Raised when a video export is cancelled
+import cv2  # OpenCV for video decoding and encoding
+import image_operations as ops  # Image operations shared with the GUI
+from edit_pipeline import EditPipeline  # Fused rendering of the edits
+
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mov", ".mkv")  # Video file types the application can open
+DEFAULT_QUEUE_SIZE = 4  # Frames waiting between two stages
+DEFAULT_FOURCC = "mp4v"  # Codec used for video output
+REPORT_EVERY = 100  # Frames between progress reports
+DONE = object()  # Marks the end of the frames in a queue
+
+
+def open_capture(source):
+    # Open a video file or a numbered image sequence such as "frames/img_%04d.png"
+    capture = cv2.VideoCapture(source)
+    if not capture.isOpened():
+        raise ValueError(f"Failed to open video: {source}")  # Raise an error if the video cannot be opened
+    return capture
+
+
+def read_first_frame(source):
+    # Decode only the first frame, used to choose the edits in the GUI
+    capture = open_capture(source)
+    try:
+        success, frame = capture.read()
+    finally:
+        capture.release()
+    if not success:
+        raise ValueError(f"Failed to read video: {source}")  # Raise an error if there are no frames
+    return frame
+
+
+def partial_path(destination):
+    # Return the temporary file a video is written to, keeping the extension so the container is chosen the same way
+    root, extension = os.path.splitext(destination)
+    return root + ".part" + extension
+
+
+def put(frames, item, stop):
+    # Put an item on a bounded queue, giving up if the pipeline stops
+    while not stop.is_set():
+        try:
+            frames.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+
+def get(frames, stop):
+    # Take an item from a queue, giving up if the pipeline stops
+    while not stop.is_set():
+        try:
+            return frames.get(timeout=0.1)
+        except queue.Empty:
+            pass
+    return DONE
+
+
+def process_video(source, destination, operations, workers=None, queue_size=DEFAULT_QUEUE_SIZE, fourcc=DEFAULT_FOURCC, cancel_event=None, report=print):
+    # Decode, edit and encode a video as pipelined stages holding only a few frames at a time
+    workers = workers or os.cpu_count() or 1  # OpenCV releases the GIL, so threads use every core
+    stop = cancel_event or threading.Event()  # Set to stop every stage
+    errors = []
+    capture = open_capture(source)
+    fps = capture.get(cv2.CAP_PROP_FPS) or 25.0  # Image sequences report no frame rate
+    decoded = queue.Queue(maxsize=queue_size)  # Frames waiting to be edited
+    edited = queue.Queue(maxsize=queue_size)  # Frames waiting to be encoded
+    in_flight = threading.BoundedSemaphore(queue_size * 2 + workers)  # Caps frames held anywhere, including out-of-order ones
+
+    def decode():
+        # Read frames in order, waiting whenever too many are in flight
+        try:
+            index = 0
+            while not stop.is_set():
+                while not in_flight.acquire(timeout=0.1):
+                    if stop.is_set():
+                        return
+                success, frame = capture.read()
+                if not success:
+                    in_flight.release()
+                    break
+                if not put(decoded, (index, frame), stop):
+                    return
+                index += 1
+        except Exception as error:
+            errors.append(error)
+            stop.set()
+        finally:
+            for _ in range(workers):
+                put(decoded, DONE, stop)  # Tell every editor there are no more frames
+
+    def edit():
+        # Apply the fused edits to each frame
+        try:
+            while True:
+                item = get(decoded, stop)
+                if item is DONE:
+                    break
+                index, frame = item
+                if not put(edited, (index, EditPipeline(frame, operations).render()), stop):
+                    break
+        except Exception as error:
+            errors.append(error)
+            stop.set()
+        finally:
+            put(edited, DONE, stop)  # Tell the encoder this editor has finished
+
+    threads = [threading.Thread(target=decode, daemon=True)] + [threading.Thread(target=edit, daemon=True) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+
+    # Encode on this thread, restoring the frame order
+    writer = None
+    temporary_path = partial_path(destination)  # The destination is only replaced once every frame is written
+    completed = False
+    waiting = {}  # Edited frames that arrived before an earlier one
+    next_index = 0
+    finished_editors = 0
+    start = time.perf_counter()
+    try:
+        while finished_editors < workers:
+            item = get(edited, stop)
+            if item is DONE:
+                if stop.is_set():
+                    break
+                finished_editors += 1
+                continue
+            index, frame = item
+            waiting[index] = frame
+            while next_index in waiting:
+                frame = waiting.pop(next_index)
+                if "%" in destination:
+                    ops.write_image(destination % next_index, frame)  # Write an image sequence
+                else:
+                    if writer is None:
+                        writer = cv2.VideoWriter(temporary_path, cv2.VideoWriter_fourcc(*fourcc), fps, (frame.shape[1], frame.shape[0]))  # Create the video once the frame size is known
+                        if not writer.isOpened():
+                            raise ValueError(f"Failed to create video: {destination}")  # Raise an error if the video cannot be written
+                    writer.write(ops.to_bgr(frame))  # Video codecs need 8-bit BGR frames
+                in_flight.release()  # Let the decoder read another frame
+                next_index += 1
+                if next_index % REPORT_EVERY == 0:
+                    report(f"{next_index} frames ({next_index / (time.perf_counter() - start):.1f} fps)")
+        completed = True
+    except BaseException:
+        stop.set()  # Stop the other stages before giving up
+        raise
+    finally:
+        for thread in threads:
+            thread.join()
+        capture.release()
+        if writer is not None:
+            writer.release()
+            if completed and not errors and not stop.is_set():
+                os.replace(temporary_path, destination)  # Replace the destination in one step, so it is never half written
+            else:
+                try:
+                    os.remove(temporary_path)  # Keep the existing destination when the export is cancelled or fails
+                except OSError:
+                    pass
+
+    if errors:
+        raise errors[0]
+    if stop.is_set():
+        raise CancelledError()  # The export was cancelled
+    elapsed = time.perf_counter() - start
+    rate = next_index / elapsed if elapsed > 0 else 0.0
+    report(f"Processed {next_index} frames in {elapsed:.2f} s ({rate:.1f} fps)")  # Report the throughput
+    return next_index, elapsed
+
+
+# Define a video export that can be cancelled, run by the GUI's background workers
+class VideoExportJob:
+    def __init__(self, source, file_path, operations):
+        self.source = source  # Video or image sequence to read
+        self.file_path = file_path  # Destination file
+        self.operations = operations  # Edits chosen on the first frame
+        self.cancel_event = threading.Event()  # Set when the export is cancelled
+        self.future = None  # Future of the running job
+        self.seconds = None  # Time the finished export took
+        self.frames = None  # Number of frames the finished export wrote
+        self.progress = ""  # Latest progress report, read by the GUI
+
+    def cancel(self):
+        # Cancel the export; a job that has not started is dropped from the queue
+        self.cancel_event.set()
+        if self.future is not None:
+            self.future.cancel()
+
+    def report_progress(self, message):
+        # Keep the latest progress report; replacing a string is safe to read from the Tk thread
+        self.progress = message
+
+    def run(self):
+        # Process the whole video
+        self.frames, self.seconds = process_video(self.source, self.file_path, self.operations, cancel_event=self.cancel_event, report=self.report_progress)
+        return self.file_path
+
+
+def main(argv=None):
+    # Parse the command line and process the video
+    parser = argparse.ArgumentParser(description="Apply an image processing recipe to every frame of a video or image sequence.")
+    parser.add_argument("source", help='input video, or an image sequence pattern such as "frames/img_%%04d.png"')
+    parser.add_argument("destination", help='output video, or an image sequence pattern such as "out/img_%%04d.png"')
+    parser.add_argument("-r", "--recipe", required=True, help='steps to apply, e.g. "crop:10,10,200,200 grayscale rotate resize:50"')
+    parser.add_argument("-w", "--workers", type=int, help="number of editing threads (default: one per core)")
+    parser.add_argument("--queue-size", type=int, default=DEFAULT_QUEUE_SIZE, help="frames waiting between two stages")
+    parser.add_argument("--fourcc", default=DEFAULT_FOURCC, help="four-character codec code for video output")
+    args = parser.parse_args(argv)
+
+    try:
+        recipe = ops.parse_recipe(args.recipe)  # Parse the recipe before starting any work
+    except ValueError as error:
+        parser.error(str(error))
+    try:
+        process_video(args.source, args.destination, recipe, args.workers, args.queue_size, args.fourcc)
+    except (ValueError, OSError, cv2.error) as error:
+        print(error, file=sys.stderr)  # Unreadable input, unwritable output or a codec failure
+        return 1
+    return 0
+
+
+# Entry point of the video tool
+if __name__ == "__main__":
+    sys.exit(main())
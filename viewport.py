@@ -0,0 +1,230 @@
+# Import necessary libraries
+import math  # Math for tile ranges
+from collections import OrderedDict  # Ordered dictionary for the least-recently-used tile cache
+import cv2  # OpenCV for image processing
+import numpy as np  # NumPy for the tile matrices
+import tkinter as tk  # Tkinter for GUI
+from PIL import ImageTk  # PIL for displaying images on the canvases
+from edit_pipeline import EditPipeline  # Edits whose output can be shown without rendering it in full
+from preview_cache import to_display  # Conversion of pixels for display
+
+TILE_SIZE = 256  # Width and height of a rendered tile in screen pixels
+MAX_CACHED_TILES = 256  # Tiles kept for panning back and forth; more than fit on a large screen
+ZOOM_STEP = 1.25  # Zoom factor applied per mouse wheel notch
+MAX_PIXEL_SIZE = 16  # Largest zoom, in screen pixels per image pixel
+
+
+# Define a zoomable, pannable view of an image, or of the output of edits, on a canvas
+class Viewport:
+    def __init__(self, canvas, previews):
+        self.canvas = canvas  # Canvas the view is drawn on
+        self.previews = previews  # Pyramids used as the source of downscaled tiles
+        self.source = None  # Image or EditPipeline shown in the view
+        self.source_width, self.source_height = 0, 0  # Full-resolution size of what is shown
+        self.zoom = 1.0  # Magnification relative to fitting the whole image in the canvas
+        self.center_x, self.center_y = 0.5, 0.5  # Image point at the canvas centre, as a fraction of the image size
+        self.tiles = OrderedDict()  # Rendered tiles keyed by (scale, column, row)
+        self.items = {}  # Canvas items of the tiles currently drawn, keyed like the tiles
+
+    def set_image(self, image, keep_view=False):
+        # Show a new image or EditPipeline, fitting it to the canvas unless the view should be kept
+        if image is not self.source:
+            self.tiles.clear()  # Tiles of the previous image are useless
+            self.clear_items()
+        self.source = image
+        if isinstance(image, EditPipeline):
+            self.source_width, self.source_height = image.output_size()  # Tiles are rendered straight from the edits
+        else:
+            self.source_height, self.source_width = image.shape[:2]
+        if not keep_view:
+            self.zoom = 1.0  # Fit the whole image
+            self.center_x, self.center_y = 0.5, 0.5
+
+    def clear(self):
+        # Remove the image from the view
+        self.source = None
+        self.tiles.clear()
+        self.clear_items()
+
+    def clear_items(self):
+        # Delete the drawn tiles from the canvas
+        self.canvas.delete("image")
+        self.items = {}
+
+    def canvas_size(self):
+        # Return the current size of the canvas
+        return self.canvas.winfo_width(), self.canvas.winfo_height()
+
+    def fit_scale(self):
+        # Return the scale at which the whole image fits in the canvas
+        canvas_width, canvas_height = self.canvas_size()
+        return min(canvas_width / self.source_width, canvas_height / self.source_height)
+
+    def scale(self):
+        # Return the current number of screen pixels per image pixel
+        return round(self.fit_scale() * self.zoom, 6)  # Rounding keeps tile keys stable when zooming back
+
+    def origin(self):
+        # Return the canvas position of the image's top-left corner
+        canvas_width, canvas_height = self.canvas_size()
+        scale = self.scale()
+        return canvas_width / 2 - self.center_x * self.source_width * scale, canvas_height / 2 - self.center_y * self.source_height * scale
+
+    def canvas_to_image(self, x, y):
+        # Map a canvas position to image coordinates
+        origin_x, origin_y = self.origin()
+        scale = self.scale()
+        return (x - origin_x) / scale, (y - origin_y) / scale
+
+    def image_to_canvas(self, x, y):
+        # Map image coordinates to a canvas position
+        origin_x, origin_y = self.origin()
+        scale = self.scale()
+        return origin_x + x * scale, origin_y + y * scale
+
+    def zoom_at(self, x, y, factor):
+        # Zoom by a factor, keeping the image point under the canvas position (x, y) in place
+        if self.source is None:
+            return
+        image_x, image_y = self.canvas_to_image(x, y)
+        max_zoom = max(1.0, MAX_PIXEL_SIZE / self.fit_scale())
+        self.zoom = min(max(self.zoom * factor, 1.0), max_zoom)  # Never zoom out past fitting the canvas
+        canvas_width, canvas_height = self.canvas_size()
+        scale = self.scale()
+        self.center_x = (image_x + (canvas_width / 2 - x) / scale) / self.source_width
+        self.center_y = (image_y + (canvas_height / 2 - y) / scale) / self.source_height
+        self.clamp_center()
+
+    def pan(self, dx, dy):
+        # Move the view by a distance in canvas pixels
+        if self.source is None:
+            return
+        scale = self.scale()
+        self.center_x -= dx / (self.source_width * scale)
+        self.center_y -= dy / (self.source_height * scale)
+        self.clamp_center()
+
+    def clamp_center(self):
+        # Keep the image covering the canvas, or centred when it is smaller than the canvas
+        canvas_width, canvas_height = self.canvas_size()
+        scale = self.scale()
+        visible_x = canvas_width / (self.source_width * scale)  # Fraction of the image width that fits in the canvas
+        visible_y = canvas_height / (self.source_height * scale)  # Fraction of the image height that fits in the canvas
+        self.center_x = 0.5 if visible_x >= 1 else min(max(self.center_x, visible_x / 2), 1 - visible_x / 2)
+        self.center_y = 0.5 if visible_y >= 1 else min(max(self.center_y, visible_y / 2), 1 - visible_y / 2)
+
+    def render(self):
+        # Draw the tiles covering the visible part of the image
+        if self.source is None:
+            return
+        canvas_width, canvas_height = self.canvas_size()
+        if canvas_width <= 1 or canvas_height <= 1:
+            return  # The canvas is not mapped yet
+        scaled_width, scaled_height, tiles = self.layout()
+
+        visible = {}
+        for key, x, y in tiles:
+            photo = self.tile(key, scaled_width, scaled_height)
+            item = self.items.pop(key, None)
+            if item is None:
+                item = self.canvas.create_image(x, y, anchor=tk.NW, image=photo, tags=("image",))  # Draw the new tile
+            else:
+                self.canvas.coords(item, x, y)  # Move the tile that is already drawn
+            visible[key] = item
+        for item in self.items.values():
+            self.canvas.delete(item)  # Delete the tiles that scrolled out of view
+        self.items = visible
+        self.canvas.tag_raise("rect")  # Keep the crop rectangle above the image
+
+    def layout(self):
+        # Return the image size on screen and the (key, x, y) of every visible tile
+        canvas_width, canvas_height = self.canvas_size()
+        scale = self.scale()
+        scaled_width, scaled_height = max(1, round(self.source_width * scale)), max(1, round(self.source_height * scale))  # Image size on screen
+        origin_x, origin_y = self.origin()
+        origin_x, origin_y = round(origin_x), round(origin_y)  # Whole pixels keep tile seams invisible
+        tiles = [((scale, column, row), origin_x + column * TILE_SIZE, origin_y + row * TILE_SIZE) for column, row in visible_tiles(origin_x, origin_y, scaled_width, scaled_height, canvas_width, canvas_height)]
+        return scaled_width, scaled_height, tiles
+
+    def render_pixels(self, key, scaled_width, scaled_height):
+        # Render the pixels of a tile, from the image or straight from the edits
+        if isinstance(self.source, EditPipeline):
+            return render_pipeline_tile(self.source, self.previews, *key, scaled_width, scaled_height)
+        return render_tile(self.source, self.previews, *key, scaled_width, scaled_height)
+
+    def tile(self, key, scaled_width, scaled_height):
+        # Return a cached tile, rendering it on a miss
+        photo = self.tiles.get(key)
+        if photo is not None:
+            self.tiles.move_to_end(key)  # Mark the tile as recently used
+            return photo
+        photo = ImageTk.PhotoImage(to_display(self.render_pixels(key, scaled_width, scaled_height)))
+        self.tiles[key] = photo
+        while len(self.tiles) > MAX_CACHED_TILES:
+            self.tiles.popitem(last=False)  # Forget the least recently used tile; drawn tiles keep their own reference
+        return photo
+
+
+def visible_tiles(origin_x, origin_y, scaled_width, scaled_height, canvas_width, canvas_height):
+    # Yield the (column, row) of every tile that intersects the canvas
+    first_column = max(0, -origin_x // TILE_SIZE)
+    first_row = max(0, -origin_y // TILE_SIZE)
+    last_column = min(math.ceil(scaled_width / TILE_SIZE), math.ceil((canvas_width - origin_x) / TILE_SIZE))
+    last_row = min(math.ceil(scaled_height / TILE_SIZE), math.ceil((canvas_height - origin_y) / TILE_SIZE))
+    for row in range(first_row, last_row):
+        for column in range(first_column, last_column):
+            yield column, row
+
+
+def tile_bounds(column, row, scaled_width, scaled_height):
+    # Return the screen rectangle (left, top, width, height) of a tile of an image shown at a size
+    left, top = column * TILE_SIZE, row * TILE_SIZE
+    return left, top, min(TILE_SIZE, scaled_width - left), min(TILE_SIZE, scaled_height - top)
+
+
+def source_bounds(left, top, tile_width, tile_height, ratio_x, ratio_y, source_width, source_height):
+    # Return the source rectangle under a tile, with a pixel of margin for filtering
+    x0 = max(0, math.floor(left * ratio_x) - 1)
+    y0 = max(0, math.floor(top * ratio_y) - 1)
+    x1 = min(source_width, math.ceil((left + tile_width) * ratio_x) + 1)
+    y1 = min(source_height, math.ceil((top + tile_height) * ratio_y) + 1)
+    return x0, y0, x1, y1
+
+
+def render_tile(image, previews, scale, column, row, scaled_width, scaled_height):
+    # Render the pixels of one tile of an image shown at a scale
+    left, top, tile_width, tile_height = tile_bounds(column, row, scaled_width, scaled_height)
+    source = image
+    if scale < 1:
+        source = previews.pyramid(image).level_for(scaled_width, scaled_height)  # Start from the nearest smaller level
+    source_height, source_width = source.shape[:2]
+    ratio_x, ratio_y = source_width / scaled_width, source_height / scaled_height  # Source pixels per screen pixel
+    x0, y0, x1, y1 = source_bounds(left, top, tile_width, tile_height, ratio_x, ratio_y, source_width, source_height)
+    region = source[y0:y1, x0:x1]
+
+    if ratio_x > 1 or ratio_y > 1:
+        # Shrinking: average the pixels under each screen pixel
+        exact = region[math.floor(top * ratio_y) - y0:math.ceil((top + tile_height) * ratio_y) - y0, math.floor(left * ratio_x) - x0:math.ceil((left + tile_width) * ratio_x) - x0]
+        return cv2.resize(exact, (tile_width, tile_height), interpolation=cv2.INTER_AREA)
+    return enlarge_region(region, x0, y0, ratio_x, ratio_y, left, top, tile_width, tile_height, scale)
+
+
+def render_pipeline_tile(pipeline, previews, scale, column, row, scaled_width, scaled_height):
+    # Render the pixels of one tile of the output of edits, without rendering the rest of the output
+    left, top, tile_width, tile_height = tile_bounds(column, row, scaled_width, scaled_height)
+    pyramid = previews.pyramid(pipeline.source)  # Downscaled sources for tiles shown smaller than the source
+    if scale < 1:
+        return pipeline.render_region(scaled_width, scaled_height, left, top, tile_width, tile_height, pyramid)  # Shrink within the fused render
+    # Zoomed past full resolution: render only the output pixels under the tile, then enlarge them like an image
+    output_width, output_height = pipeline.output_size()
+    ratio_x, ratio_y = output_width / scaled_width, output_height / scaled_height  # Output pixels per screen pixel
+    x0, y0, x1, y1 = source_bounds(left, top, tile_width, tile_height, ratio_x, ratio_y, output_width, output_height)
+    region = pipeline.render_region(output_width, output_height, x0, y0, x1 - x0, y1 - y0, pyramid)
+    return enlarge_region(region, x0, y0, ratio_x, ratio_y, left, top, tile_width, tile_height, scale)
+
+
+def enlarge_region(region, x0, y0, ratio_x, ratio_y, left, top, tile_width, tile_height, scale):
+    # Enlarge a source region cut out at (x0, y0) into a tile, sampling pixel centres exactly so each pixel lines up with the crop mapping
+    matrix = np.array([[1 / ratio_x, 0, (0.5 / ratio_x - 0.5) - left + x0 / ratio_x], [0, 1 / ratio_y, (0.5 / ratio_y - 0.5) - top + y0 / ratio_y]])
+    interpolation = cv2.INTER_NEAREST if scale >= 2 else cv2.INTER_LINEAR  # Show individual pixels when zoomed in
+    return cv2.warpAffine(region, matrix, (tile_width, tile_height), flags=interpolation, borderMode=cv2.BORDER_REPLICATE)